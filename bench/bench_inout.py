@@ -0,0 +1,169 @@
+import argparse
+import dataclasses
+import json
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import typing
+
+INOUT = pathlib.Path(__file__).resolve().parent.parent / "src" / "pp" / "inout.py"
+
+SIZES = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+@dataclasses.dataclass
+class Variant:
+    name: str
+    args: list[str]
+    stdin: str
+    maxsize: int = 1 << 62
+
+
+VARIANTS = [
+    Variant("cat", [], "pipe"),
+    Variant("text", [], "pipe", 1 << 20),
+    Variant("thread-4k", ["-b", "--no-zerocopy", "--no-mmap", "--chunk", "4096"], "pipe"),
+    Variant("thread-64k", ["-b", "--no-zerocopy", "--no-mmap", "--chunk", "65536"], "pipe"),
+    Variant("thread-1m", ["-b", "--no-zerocopy", "--no-mmap", "--chunk", "1048576"], "pipe"),
+    Variant("splice", ["-b"], "pipe"),
+    Variant("sendfile", ["-b"], "file"),
+    Variant("mmap", ["-b", "--no-zerocopy"], "file"),
+]
+
+
+@dataclasses.dataclass
+class Result:
+    variant: str
+    size: int
+    seconds: float
+    mbps: float
+    maxrss_kb: int
+    p50_us: int | None
+    p99_us: int | None
+
+
+def size_parse(s: str) -> int:
+    return int(s[:-1]) * SIZES[s[-1].upper()] if s[-1].upper() in SIZES else int(s)
+
+
+def payload(path: pathlib.Path, size: int) -> None:
+    block = os.urandom(1 << 20)
+    with open(path, "wb") as f:
+        while size > 0:
+            f.write(block[: min(size, len(block))])
+            size -= len(block)
+
+
+def drain(fd: int, out: list[int]) -> None:
+    n = 0
+    while len(d := os.read(fd, 1 << 20)):
+        n += len(d)
+    out.append(n)
+
+
+def hwm(pid: int, stop: threading.Event, out: list[int]) -> None:
+    n = 0
+    while True:
+        try:
+            with open(f"""/proc/{pid}/status""") as f:
+                for l in f:
+                    if l.startswith("VmHWM:"):
+                        n = max(n, int(l.split()[1]))
+        except OSError:
+            break
+        if stop.wait(0.005):
+            break
+    out.append(n)
+
+
+def run_one(v: Variant, path: pathlib.Path, size: int, tmp: pathlib.Path) -> Result:
+    stats = tmp / "stats.json"
+    stats.unlink(missing_ok=True)
+    if v.name == "cat":
+        cmd = ["cat"]
+    else:
+        cmd = [sys.executable, str(INOUT), *v.args, "--stats-json", str(stats)]
+
+    t0 = time.perf_counter()
+    with open(path, "rb") as fi:
+        feed = subprocess.Popen(["cat"], stdin=fi, stdout=subprocess.PIPE) if v.stdin == "pipe" else None
+        p = subprocess.Popen(cmd, stdin=feed.stdout if feed else fi, stdout=subprocess.PIPE)
+    if feed:
+        typing.cast(typing.IO[bytes], feed.stdout).close()
+    out = list[int]()
+    rss = list[int]()
+    stop = threading.Event()
+    th = threading.Thread(target=drain, args=(typing.cast(typing.IO[bytes], p.stdout).fileno(), out))
+    tr = threading.Thread(target=hwm, args=(p.pid, stop, rss))
+    th.start()
+    tr.start()
+    th.join()
+    stop.set()
+    tr.join()
+    p.wait()
+    typing.cast(typing.IO[bytes], p.stdout).close()
+    if feed:
+        feed.wait()
+    dt = time.perf_counter() - t0
+
+    if p.returncode != 0 or out[0] != size:
+        raise RuntimeError(f"""{v.name}: returncode={p.returncode} copied={out[0]} expected={size}""")
+    st = json.loads(stats.read_text()) if stats.exists() else {}
+    lat = st.get("lat")
+    return Result(
+        v.name,
+        size,
+        dt,
+        size / dt / 1e6,
+        rss[0],
+        st.get("p50_us") if lat and sum(lat) else None,
+        st.get("p99_us") if lat and sum(lat) else None,
+    )
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--sizes", default="1K,1M,64M,1G")
+    p.add_argument("--variants", default=",".join(v.name for v in VARIANTS))
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--out", default="bench_inout.json")
+    a = p.parse_args()
+
+    names = a.variants.split(",")
+    variants = [v for v in VARIANTS if v.name in names]
+    results = list[Result]()
+    with tempfile.TemporaryDirectory() as d:
+        tmp = pathlib.Path(d)
+        for size in [size_parse(s) for s in a.sizes.split(",")]:
+            payload(path := tmp / "payload", size)
+            for v in variants:
+                if size > v.maxsize:
+                    continue
+                best = min((run_one(v, path, size, tmp) for _ in range(a.repeat)), key=lambda r: r.seconds)
+                results.append(best)
+                print(
+                    f"""{v.name:<12} {size:>12} {best.mbps:>10.1f} MB/s {best.maxrss_kb:>8} KiB"""
+                    f""" p50={best.p50_us} p99={best.p99_us}""",
+                    file=sys.stderr,
+                )
+
+    with open(a.out, "w") as f:
+        json.dump(
+            {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "time": time.time(),
+                "results": [dataclasses.asdict(r) for r in results],
+            },
+            f,
+            indent=1,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import json
+import pathlib
+import sys
+import time
+import typing
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+import pp.taskgroup as tg  # noqa: E402
+
+
+async def nop() -> None:
+    pass
+
+
+async def spawn_track_coro(n: int) -> float:
+    async with tg.FallbaWait():
+        async with tg.Group() as gr:
+            t0 = time.perf_counter()
+            for _ in range(n):
+                await gr.track_coro(nop())
+            dt = time.perf_counter() - t0
+            await gr.wait()
+    return dt
+
+
+async def spawn_track_many(n: int) -> float:
+    async with tg.FallbaWait():
+        async with tg.Group() as gr:
+            t0 = time.perf_counter()
+            gr.track_many(nop() for _ in range(n))
+            dt = time.perf_counter() - t0
+            await gr.wait()
+    return dt
+
+
+async def spawn_gather(n: int) -> float:
+    t0 = time.perf_counter()
+    fut = asyncio.gather(*(nop() for _ in range(n)))
+    dt = time.perf_counter() - t0
+    await fut
+    return dt
+
+
+async def spawn_taskgroup(n: int) -> float:
+    async with asyncio.TaskGroup() as g:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            g.create_task(nop())
+        dt = time.perf_counter() - t0
+    return dt
+
+
+VARIANTS: dict[str, typing.Callable[[int], typing.Awaitable[float]]] = {
+    "track_coro": spawn_track_coro,
+    "track_many": spawn_track_many,
+    "gather": spawn_gather,
+    "TaskGroup": spawn_taskgroup,
+}
+
+
+async def amain(n: int, repeat: int) -> dict[str, typing.Any]:
+    res = dict[str, typing.Any]()
+    for name, fn in VARIANTS.items():
+        spawn = total = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            spawn = min(spawn, await fn(n))
+            total = min(total, time.perf_counter() - t0)
+        res[name] = {"spawn_per_s": n / spawn, "total_per_s": n / total}
+    return res
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("-n", type=int, default=100000)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--out", default="bench_spawn.json")
+    a = p.parse_args()
+
+    res = asyncio.run(amain(a.n, a.repeat))
+    for k, v in res.items():
+        print(f"""{k:<10} spawn={v["spawn_per_s"]:>12.0f}/s total={v["total_per_s"]:>12.0f}/s""", file=sys.stderr)
+    with open(a.out, "w") as f:
+        json.dump({"n": a.n, **res}, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import asyncio
+import gc
+import json
+import pathlib
+import sys
+import tracemalloc
+import typing
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+import pp.taskgroup as tg  # noqa: E402
+
+
+class DictWrapTask:
+    # the wrapper as it was before __slots__: per-instance __dict__, future kept after completion
+
+    def __init__(self, task: asyncio.Future[typing.Any]) -> None:
+        self.task = task
+        self._restyp = tg.Restyp.NA
+        self._result: typing.Any = None
+        self._seen = False
+        self._seq = next(tg._seq)
+        self._waitees: list[tg.Waitee] = []
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Future[typing.Any]) -> None:
+        if self._restyp is tg.Restyp.NA:
+            self._result_set_try()
+
+    def done(self) -> bool:
+        return self._restyp is not tg.Restyp.NA or self.task.done()
+
+    def cancelled(self) -> bool:
+        return self._restyp is tg.Restyp.EXC and isinstance(self._result, asyncio.CancelledError)
+
+    def _result_set_try(self) -> None:
+        if self.task.done():
+            if self.task.cancelled():
+                self._restyp = tg.Restyp.EXC
+                self._result = asyncio.CancelledError()
+            elif (exc := self.task.exception()) is not None:
+                self._restyp = tg.Restyp.EXC
+                self._result = exc
+            else:
+                self._restyp = tg.Restyp.VAL
+                self._result = self.task.result()
+            for w in self._waitees:
+                w._on_done(typing.cast(tg.WrapTask, self))
+
+
+async def measure(n: int, wrap: typing.Callable[[asyncio.Future[typing.Any]], typing.Any]) -> dict[str, float]:
+    loop = asyncio.get_running_loop()
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+
+    w = tg.Waitee()
+    futs = [loop.create_future() for _ in range(n)]
+    for f in futs:
+        w._track_task(typing.cast(tg.WrapTask, wrap(f)))
+    pend = tracemalloc.get_traced_memory()[0] - base
+
+    for f in futs:
+        f.set_result(None)
+    del futs
+    await asyncio.sleep(0)
+    gc.collect()
+    done = tracemalloc.get_traced_memory()[0] - base
+
+    tracemalloc.stop()
+    assert w.ndone == n
+    return {"pending_bytes_per_task": pend / n, "done_bytes_per_task": done / n}
+
+
+async def amain(n: int) -> dict[str, typing.Any]:
+    return {
+        "n": n,
+        "slots": await measure(n, tg.WrapTask),
+        "dict": await measure(n, DictWrapTask),
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("-n", type=int, default=100000)
+    p.add_argument("--out", default="bench_taskgroup.json")
+    a = p.parse_args()
+
+    res = asyncio.run(amain(a.n))
+    for k in ("slots", "dict"):
+        print(
+            f"""{k:<6} pending={res[k]["pending_bytes_per_task"]:.1f} B/task"""
+            f""" done={res[k]["done_bytes_per_task"]:.1f} B/task""",
+            file=sys.stderr,
+        )
+    with open(a.out, "w") as f:
+        json.dump(res, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
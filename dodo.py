@@ -36,5 +36,17 @@ def task_upload_test() -> dict:
     }
 
 
+def task_bench_inout() -> dict:
+    return {"actions": ["py bench/bench_inout.py --out bench_inout.json"], "verbosity": 2}
+
+
+def task_bench_taskgroup() -> dict:
+    return {"actions": ["py bench/bench_taskgroup.py --out bench_taskgroup.json"], "verbosity": 2}
+
+
+def task_bench_spawn() -> dict:
+    return {"actions": ["py bench/bench_spawn.py --out bench_spawn.json"], "verbosity": 2}
+
+
 def task_test_tox() -> dict:
     return {"actions": ["py -m tox"], "verbosity": 2}
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import typing
+
+import pp.taskgroup as tg
+from pp.inout import CHUNK, HIGH
+
+
+async def _reader(r: asyncio.StreamReader, q: asyncio.Queue[bytes], chunk: int) -> None:
+    while True:
+        d = await r.read(chunk)
+        await q.put(d)
+        if not len(d):
+            return
+
+
+async def _writer(w: asyncio.StreamWriter, q: asyncio.Queue[bytes]) -> None:
+    while True:
+        d = await q.get()
+        if not len(d):
+            w.close()
+            await w.wait_closed()
+            return
+        w.write(d)
+        await w.drain()
+
+
+async def pump(fi: typing.IO[bytes], fo: typing.IO[bytes], chunk: int = CHUNK, high: int = HIGH) -> None:
+    loop = asyncio.get_running_loop()
+    r = asyncio.StreamReader(limit=high)
+    rt, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(r), fi)
+    try:
+        wt, wp = await loop.connect_write_pipe(lambda: asyncio.StreamReaderProtocol(asyncio.StreamReader()), fo)
+        try:
+            w = asyncio.StreamWriter(wt, wp, None, loop)
+            q = asyncio.Queue[bytes](max(1, high // chunk))
+            async with tg.Group() as g:
+                await g.track_coro(_reader(r, q, chunk), name=f"""{pump.__name__}::{_reader.__name__}""")
+                await g.track_coro(_writer(w, q), name=f"""{pump.__name__}::{_writer.__name__}""")
+                await g.wait()
+        finally:
+            wt.close()
+    finally:
+        rt.close()
+
+
+async def arun(chunk: int = CHUNK, high: int = HIGH) -> None:
+    async with tg.FallbaWait():
+        await pump(sys.stdin.buffer, sys.stdout.buffer, chunk, high)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--chunk", type=int, default=CHUNK)
+    p.add_argument("--high", type=int, default=HIGH)
+    a = p.parse_args()
+    try:
+        asyncio.run(arun(a.chunk, a.high))
+    except tg.GroupException:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
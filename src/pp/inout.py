@@ -1,39 +1,468 @@
-import queue
+import argparse
+import collections
+import dataclasses
+import enum
+import errno
+import io
+import json
+import mmap
+import os
+import selectors
+import stat
 import sys
 import threading
+import time
 import traceback
+import typing
+
+CHUNK = 65536
+KCHUNK = 1 << 20
+HIGH = 1 << 22
+FLUSH = 1 << 20
+WINDOW = 1 << 26
+IOV_MAX = os.sysconf('SC_IOV_MAX') if hasattr(os, 'sysconf') else 1024
+
+
+@dataclasses.dataclass
+class Stats:
+    nput: int = 0
+    nget: int = 0
+    npeak: int = 0
+    nblock: int = 0
+    tblock: float = 0.0
+    depth: int = 0
+    rbytes: int = 0
+    rchunks: int = 0
+    wbytes: int = 0
+    wchunks: int = 0
+    nwrite: int = 0
+    lat: list[int] = dataclasses.field(default_factory=lambda: [0] * 40)
+
+    def latency(self, ns: int) -> None:
+        self.lat[min((ns // 1000).bit_length(), len(self.lat) - 1)] += 1
+
+    def pct(self, p: float) -> int:
+        k = p * sum(self.lat)
+        acc = 0
+        for i, n in enumerate(self.lat):
+            acc += n
+            if n and acc >= k:
+                return 1 << i
+        return 0
+
+    def line(self) -> str:
+        return (
+            f'inout rbytes={self.rbytes} rchunks={self.rchunks} wbytes={self.wbytes} wchunks={self.wchunks}'
+            f' nwrite={self.nwrite} depth={self.depth} npeak={self.npeak} nblock={self.nblock}'
+            f' tblock={self.tblock:.3f} p50={self.pct(0.5)}us p99={self.pct(0.99)}us'
+        )
+
+    def dump(self) -> dict[str, typing.Any]:
+        return dataclasses.asdict(self) | {'p50_us': self.pct(0.5), 'p99_us': self.pct(0.99)}
+
+
+class ByteQueue:
+    high: int
+    low: int
+    size: int
+    closed: bool
+    items: collections.deque[typing.Any]
+    times: collections.deque[int]
+    stats: Stats
+
+    def __init__(self, high: int = HIGH, low: int | None = None) -> None:
+        self.high = high
+        self.low = high // 2 if low is None else low
+        self.size = 0
+        self.closed = False
+        self.items = collections.deque()
+        self.times = collections.deque()
+        self.stats = Stats()
+        self._lock = threading.Lock()
+        self._nonempty = threading.Condition(self._lock)
+        self._drained = threading.Condition(self._lock)
+
+    def put(self, d: typing.Any) -> bool:
+        with self._lock:
+            if self.size >= self.high and not self.closed:
+                self.stats.nblock += 1
+                t = time.monotonic()
+                self._drained.wait_for(lambda: self.size <= self.low or self.closed)
+                self.stats.tblock += time.monotonic() - t
+            if self.closed:
+                return False
+            self._append(d)
+            return True
+
+    def put_nowait(self, d: typing.Any) -> bool:
+        with self._lock:
+            if self.closed or self.size >= self.high:
+                return False
+            self._append(d)
+            return True
+
+    def _append(self, d: typing.Any) -> None:
+        self.items.append(d)
+        self.times.append(time.monotonic_ns())
+        self.size += len(d)
+        self.stats.nput += 1
+        self.stats.depth = self.size
+        self.stats.npeak = max(self.stats.npeak, self.size)
+        self._nonempty.notify()
+
+    def get(self) -> typing.Any:
+        with self._lock:
+            self._nonempty.wait_for(lambda: len(self.items))
+            d = self.items.popleft()
+            self.times.popleft()
+            self.size -= len(d)
+            self.stats.nget += 1
+            self.stats.depth = self.size
+            if self.size <= self.low:
+                self._drained.notify()
+            return d
+
+    def get_all(self, timeout: float | None = None, times: list[int] | None = None) -> list[typing.Any]:
+        with self._lock:
+            if not self._nonempty.wait_for(lambda: len(self.items) or self.closed, timeout) or not len(self.items):
+                return []
+            ds = list(self.items)
+            if times is not None:
+                times.extend(self.times)
+            self.items.clear()
+            self.times.clear()
+            self.size = 0
+            self.stats.nget += len(ds)
+            self.stats.depth = 0
+            self._drained.notify()
+            return ds
+
+    def close(self) -> None:
+        with self._lock:
+            self.closed = True
+            self._drained.notify_all()
+            self._nonempty.notify_all()
+
 
 err: list[BaseException] = []
-q = queue.Queue()
+q = ByteQueue()
 
-def ti() -> None:
+def ti(binary: bool = False, chunk: int = CHUNK) -> None:
     try:
         while True:
-            d = sys.stdin.read(1)
-            q.put(d)
-            if not len(d):
+            d = typing.cast(io.BufferedReader, sys.stdin.buffer).read1(chunk) if binary else sys.stdin.read(1)
+            q.stats.rbytes += len(d)
+            q.stats.rchunks += 1
+            if not q.put(d) or not len(d):
                 return
     except BaseException as e:
         err.append(e)
         traceback.print_exc(file=sys.stderr)
 
-def to() -> None:
+def writev(fd: int, bufs: list[typing.Any]) -> None:
+    i = 0
+    while i < len(bufs):
+        z = os.writev(fd, bufs[i : i + IOV_MAX])
+        while z and z >= len(bufs[i]):
+            z -= len(bufs[i])
+            i += 1
+        if z:
+            bufs[i] = memoryview(bufs[i])[z:]
+
+def to(binary: bool = False, flush_bytes: int = FLUSH, flush_ms: float = 0.0) -> None:
     try:
-        while True:
-            d = q.get()
-            if not len(d):
-                sys.stdout.close()
-                return
-            z = sys.stdout.write(d)
-            assert z == len(d)
-            sys.stdout.flush()
+        sys.stdout.flush()
+        pend = list[typing.Any]()
+        times = list[int]()
+        n = 0
+        t0 = 0.0
+        eof = False
+        while not eof:
+            ds = q.get_all(max(0.0, t0 + flush_ms / 1000 - time.monotonic()) if len(pend) else None, times)
+            if len(ds) and not len(pend):
+                t0 = time.monotonic()
+            for d in ds:
+                if not len(d):
+                    eof = True
+                    break
+                pend.append(d)
+                n += len(d)
+            if not len(pend):
+                continue
+            if eof or not flush_ms or n >= flush_bytes or time.monotonic() >= t0 + flush_ms / 1000:
+                if binary:
+                    writev(sys.stdout.fileno(), pend)
+                else:
+                    sys.stdout.write(''.join(pend))
+                    sys.stdout.flush()
+                now = time.monotonic_ns()
+                for t in times[: len(pend)]:
+                    q.stats.latency(now - t)
+                q.stats.wbytes += n
+                q.stats.wchunks += len(pend)
+                q.stats.nwrite += 1
+                pend = []
+                times = []
+                n = 0
+        sys.stdout.close()
+    except BaseException as e:
+        q.close()
+        err.append(e)
+        traceback.print_exc(file=sys.stderr)
+
+def kcopy(fi: int, fo: int, chunk: int = KCHUNK) -> bool:
+    mi, mo = os.fstat(fi).st_mode, os.fstat(fo).st_mode
+    if stat.S_ISREG(mi):
+        def f() -> int:
+            return os.sendfile(fo, fi, None, chunk)
+    elif hasattr(os, 'splice') and (stat.S_ISFIFO(mi) or stat.S_ISFIFO(mo)):
+        def f() -> int:
+            return os.splice(fi, fo, chunk)
+    else:
+        return False
+    n = 0
+    while True:
+        try:
+            z = f()
+        except OSError as e:
+            if not n and e.errno in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+                return False
+            raise
+        if not z:
+            return True
+        n += z
+
+def mcopy(fi: int, fo: int, chunk: int = KCHUNK, window: int = WINDOW) -> bool:
+    st = os.fstat(fi)
+    if not stat.S_ISREG(st.st_mode) or not st.st_size:
+        return False
+    pos = os.lseek(fi, 0, os.SEEK_CUR)
+    window = max(window - window % mmap.ALLOCATIONGRANULARITY, mmap.ALLOCATIONGRANULARITY)
+    while pos < st.st_size:
+        base = pos - pos % mmap.ALLOCATIONGRANULARITY
+        size = min(window, st.st_size - base)
+        with mmap.mmap(fi, size, access=mmap.ACCESS_READ, offset=base) as mm:
+            if hasattr(mm, 'madvise'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            with memoryview(mm) as mv:
+                i = pos - base
+                while i < size:
+                    i += os.write(fo, mv[i : min(i + chunk, size)])
+        pos = base + size
+        os.lseek(fi, pos, os.SEEK_SET)
+    # whatever was appended after the fstat
+    while len(d := os.read(fi, chunk)):
+        with memoryview(d) as mv:
+            i = 0
+            while i < len(mv):
+                i += os.write(fo, mv[i:])
+    return True
+
+def tk(chunk: int = CHUNK, copy: typing.Callable[[int, int, int], bool] = kcopy) -> bool:
+    try:
+        fi, fo = sys.stdin.fileno(), sys.stdout.fileno()
+    except io.UnsupportedOperation:
+        return False
+    try:
+        sys.stdout.flush()
+        if not copy(fi, fo, max(chunk, KCHUNK)):
+            return False
+        sys.stdout.close()
     except BaseException as e:
         err.append(e)
         traceback.print_exc(file=sys.stderr)
+    return True
+
+class Pair:
+    src: int
+    dst: int
+    buf: bytearray
+    eof: bool
+    done: bool
+    err: list[BaseException]
+
+    def __init__(self, src: int, dst: int) -> None:
+        self.src = src
+        self.dst = dst
+        self.buf = bytearray()
+        self.eof = False
+        self.done = False
+        self.err = []
+
+
+def mux(pairs: typing.Iterable[tuple[int, int]], chunk: int = CHUNK, high: int = HIGH) -> list[list[BaseException]]:
+    ps = [Pair(src, dst) for src, dst in pairs]
+    rd = {p.src: p for p in ps}
+    wr = {p.dst: p for p in ps}
+    sel = selectors.DefaultSelector()
+
+    def sync(fd: int) -> None:
+        ev = 0
+        if (p := rd.get(fd)) is not None and not p.eof and len(p.buf) < high:
+            ev |= selectors.EVENT_READ
+        if (p := wr.get(fd)) is not None and len(p.buf):
+            ev |= selectors.EVENT_WRITE
+        try:
+            key = sel.get_key(fd)
+        except KeyError:
+            if ev:
+                sel.register(fd, ev)
+            return
+        if not ev:
+            sel.unregister(fd)
+        elif ev != key.events:
+            sel.modify(fd, ev)
+
+    def finish(p: Pair) -> None:
+        p.done = True
+        del rd[p.src], wr[p.dst]
+        sync(p.src)
+        sync(p.dst)
+        os.close(p.dst)
+
+    def step(p: Pair, ev: int) -> None:
+        if ev & selectors.EVENT_READ:
+            try:
+                d = os.read(p.src, chunk)
+            except BlockingIOError:
+                d = None
+            if d is not None:
+                p.buf += d
+                p.eof = not len(d)
+        if ev & selectors.EVENT_WRITE and len(p.buf):
+            try:
+                z = os.write(p.dst, p.buf)
+            except BlockingIOError:
+                z = 0
+            del p.buf[:z]
+        if p.eof and not len(p.buf):
+            finish(p)
+        else:
+            sync(p.src)
+            sync(p.dst)
+
+    try:
+        for p in ps:
+            os.set_blocking(p.src, False)
+            os.set_blocking(p.dst, False)
+            sync(p.src)
+        while len(rd):
+            for key, ev in sel.select():
+                for m, e in ((rd, ev & selectors.EVENT_READ), (wr, ev & selectors.EVENT_WRITE)):
+                    if not e or (p_ := m.get(key.fd)) is None or p_.done:
+                        continue
+                    try:
+                        step(p_, e)
+                    except BaseException as exc:
+                        p_.err.append(exc)
+                        if not p_.done:
+                            finish(p_)
+    finally:
+        sel.close()
+    return [p.err for p in ps]
+
+class Slow(enum.Enum):
+    BLOCK = 0
+    DROP = 1
+    DETACH = 2
+
+
+class Sink:
+    f: typing.IO[typing.Any]
+    slow: Slow
+    q: ByteQueue
+    ndrop: int
+    detached: bool
+    err: list[BaseException]
+
+    def __init__(self, f: typing.IO[typing.Any], slow: Slow = Slow.BLOCK, high: int = HIGH, low: int | None = None):
+        self.f = f
+        self.slow = slow
+        self.q = ByteQueue(high, low)
+        self.ndrop = 0
+        self.detached = False
+        self.err = []
+
+    def put(self, d: bytes) -> None:
+        if self.slow is Slow.BLOCK or not len(d):
+            self.q.put(d)
+        elif not self.q.put_nowait(d) and not self.q.closed:
+            if self.slow is Slow.DROP:
+                self.ndrop += 1
+            else:
+                self.detached = True
+                self.q.close()
+
+    def writer(self) -> None:
+        try:
+            self.f.flush()
+            fd = self.f.fileno()
+            while True:
+                if not len(ds := self.q.get_all()):
+                    break
+                eof = not len(ds[-1])
+                writev(fd, ds[:-1] if eof else ds)
+                if eof or self.q.closed:
+                    break
+            self.f.close()
+        except BaseException as e:
+            self.q.close()
+            self.err.append(e)
+            traceback.print_exc(file=sys.stderr)
+
+
+def tee(fi: int, sinks: list[Sink], chunk: int = CHUNK) -> list[BaseException]:
+    errs = list[BaseException]()
+    ts = [threading.Thread(target=s.writer, daemon=True) for s in sinks]
+    for t in ts:
+        t.start()
+    try:
+        while True:
+            d = os.read(fi, chunk)
+            for s in sinks:
+                s.put(d)
+            if not len(d) or all(s.q.closed for s in sinks):
+                break
+    except BaseException as e:
+        errs.append(e)
+        traceback.print_exc(file=sys.stderr)
+        for s in sinks:
+            s.q.put(b'')
+    finally:
+        for s, t in zip(sinks, ts):
+            if not s.detached:
+                t.join()
+    for s in sinks:
+        errs.extend(s.err)
+    return errs
 
-def run() -> None:
-    t1 = threading.Thread(target=ti)
-    t2 = threading.Thread(target=to)
+def run(
+    binary: bool = False,
+    chunk: int = CHUNK,
+    zerocopy: bool = True,
+    mapped: bool = True,
+    high: int = HIGH,
+    low: int | None = None,
+    flush_bytes: int = FLUSH,
+    flush_ms: float = 0.0,
+    tees: typing.Sequence[str] = (),
+    slow: Slow = Slow.BLOCK,
+) -> None:
+    global q
+    q = ByteQueue(high, low)
+    if len(tees):
+        fs = [open(t, 'wb') for t in tees]
+        sinks = [Sink(sys.stdout, Slow.BLOCK, high, low), *(Sink(f, slow, high, low) for f in fs)]
+        err.extend(tee(sys.stdin.fileno(), sinks, chunk))
+        if len(err):
+            sys.exit(1)
+        return
+    if binary and ((zerocopy and tk(chunk)) or (mapped and tk(chunk, mcopy))):
+        if len(err):
+            sys.exit(1)
+        return
+    t1 = threading.Thread(target=ti, args=(binary, chunk))
+    t2 = threading.Thread(target=to, args=(binary, flush_bytes, flush_ms))
     t1.start()
     t2.start()
     t1.join()
@@ -41,5 +470,49 @@ def run() -> None:
     if len(err):
         sys.exit(1)
 
+def report(interval: float, stop: threading.Event) -> None:
+    while not stop.wait(interval):
+        print(q.stats.line(), file=sys.stderr, flush=True)
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument('-b', '--binary', action='store_true')
+    p.add_argument('--chunk', type=int, default=CHUNK)
+    p.add_argument('--no-zerocopy', dest='zerocopy', action='store_false')
+    p.add_argument('--no-mmap', dest='mapped', action='store_false')
+    p.add_argument('--high', type=int, default=HIGH)
+    p.add_argument('--low', type=int, default=None)
+    p.add_argument('--flush-bytes', type=int, default=FLUSH)
+    p.add_argument('--flush-ms', type=float, default=0.0)
+    p.add_argument('--tee', dest='tees', action='append', default=[])
+    p.add_argument('--tee-slow', choices=[x.name.lower() for x in Slow], default=Slow.BLOCK.name.lower())
+    p.add_argument('--stats', action='store_true')
+    p.add_argument('--stats-interval', type=float, default=0.0)
+    p.add_argument('--stats-json', default=None)
+    a = p.parse_args()
+    stop = threading.Event()
+    if a.stats_interval:
+        threading.Thread(target=report, args=(a.stats_interval, stop), daemon=True).start()
+    try:
+        run(
+            binary=a.binary,
+            chunk=a.chunk,
+            zerocopy=a.zerocopy,
+            mapped=a.mapped,
+            high=a.high,
+            low=a.low,
+            flush_bytes=a.flush_bytes,
+            flush_ms=a.flush_ms,
+            tees=a.tees,
+            slow=Slow[a.tee_slow.upper()],
+        )
+    finally:
+        stop.set()
+        if a.stats:
+            print(q.stats.line(), file=sys.stderr)
+        if a.stats_json:
+            with open(a.stats_json, 'w') as f:
+                json.dump(q.stats.dump(), f)
+
 if __name__ == '__main__':
-    run()
+    main()
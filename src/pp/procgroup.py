@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import multiprocessing.shared_memory
+import os
+import pickle
+import socket
+import struct
+import traceback
+import typing
+
+import pp.taskgroup as tg
+
+T = typing.TypeVar("T")
+
+_jid = itertools.count()
+
+_Conn = multiprocessing.connection.Connection
+_Remote = list[tuple[str, typing.Optional[int], str, typing.Optional[str]]]
+_Msg = tuple[typing.Any, ...]
+
+_HDR = struct.Struct("!Q")
+
+
+class _Channel(asyncio.Protocol):
+    # length-prefixed pickles over the pipe's socket, writes are buffered by the transport so
+    # neither side ever blocks its loop on a full pipe
+
+    transport: asyncio.Transport | None
+    lost: asyncio.Future[None]
+    _buf: bytearray
+    _on_msg: typing.Callable[[_Msg], None]
+    _on_lost: typing.Callable[[], None]
+
+    def __init__(self, on_msg: typing.Callable[[_Msg], None], on_lost: typing.Callable[[], None]):
+        self.transport = None
+        self.lost = asyncio.get_running_loop().create_future()
+        self._buf = bytearray()
+        self._on_msg = on_msg
+        self._on_lost = on_lost
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = typing.cast(asyncio.Transport, transport)
+
+    def data_received(self, data: bytes) -> None:
+        buf = self._buf
+        buf += data
+        h = _HDR.size
+        while len(buf) >= h and len(buf) >= h + (n := _HDR.unpack_from(buf)[0]):
+            with memoryview(buf) as m, m[h : h + n] as d:
+                msg = pickle.loads(d)
+            del buf[: h + n]
+            self._on_msg(msg)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        if not self.lost.done():
+            self.lost.set_result(None)
+        self._on_lost()
+
+    def send(self, msg: _Msg) -> None:
+        if self.transport is None or self.transport.is_closing():
+            return
+        d = pickle.dumps(msg, pickle.HIGHEST_PROTOCOL)
+        self.transport.writelines([_HDR.pack(len(d)), d])
+
+    async def aclose(self) -> None:
+        if self.transport is not None:
+            self.transport.close()
+        await self.lost
+
+
+async def _connect(
+    conn: _Conn, on_msg: typing.Callable[[_Msg], None], on_lost: typing.Callable[[], None]
+) -> _Channel:
+    ch = _Channel(on_msg, on_lost)
+    sock = socket.socket(fileno=os.dup(conn.fileno()))
+    conn.close()
+    await asyncio.get_running_loop().connect_accepted_socket(lambda: ch, sock)
+    return ch
+
+
+def _pack(e: BaseException) -> BaseException:
+    try:
+        pickle.loads(pickle.dumps(e))
+        return e
+    except Exception:
+        return RuntimeError(f"""{type(e).__module__}.{type(e).__qualname__}: {e}""")
+
+
+def _rebuild(e: BaseException, remote: _Remote) -> BaseException:
+    frames = [traceback.FrameSummary(fname, lineno, name, line=line) for fname, lineno, name, line in remote]
+    setattr(e, "remote_stack", traceback.StackSummary.from_list(frames))
+    return e
+
+
+def _nbytes(val: typing.Any) -> int:
+    try:
+        m = memoryview(val)
+    except TypeError:
+        return -1
+    return m.nbytes if m.c_contiguous else -1
+
+
+def _put_shm(ch: _Channel, jid: int, val: typing.Any, n: int) -> None:
+    seg = multiprocessing.shared_memory.SharedMemory(create=True, size=n)
+    try:
+        typing.cast(memoryview, seg.buf)[:n] = memoryview(val).cast("B")
+        ch.send(("shm", jid, seg.name, n))
+    except BaseException:
+        seg.unlink()
+        raise
+    finally:
+        seg.close()
+
+
+class _Segment(multiprocessing.shared_memory.SharedMemory):
+    def __del__(self) -> None:
+        # views sliced off the result outlive the segment, the mapping goes with the last of them
+        with contextlib.suppress(BufferError):
+            super().__del__()
+
+
+def _get_shm(name: str, n: int) -> tuple[memoryview, _Segment]:
+    seg = _Segment(name)
+    seg.unlink()
+    return typing.cast(memoryview, seg.buf)[:n], seg
+
+
+def _release_shm(view: memoryview, seg: _Segment) -> None:
+    with contextlib.suppress(BufferError):
+        view.release()
+        seg.close()
+
+
+async def _job(ch: _Channel, shm: int | None, jid: int, payload: bytes) -> None:
+    try:
+        fn, args = pickle.loads(payload)
+        val = await fn(*args)
+    except asyncio.CancelledError:
+        ch.send(("canc", jid))
+        raise
+    except Exception as e:
+        remote = [(f.filename, f.lineno, f.name, f.line) for f in traceback.extract_tb(e.__traceback__)]
+        ch.send(("exc", jid, _pack(e), remote))
+        return
+    try:
+        if shm is not None and (n := _nbytes(val)) >= max(shm, 1):
+            _put_shm(ch, jid, val, n)
+            return
+        data = pickle.dumps(val)
+    except Exception as e:
+        ch.send(("exc", jid, _pack(e), []))
+        return
+    ch.send(("ok", jid, data))
+
+
+async def _serve(conn: _Conn, shm: int | None) -> None:
+    loop = asyncio.get_running_loop()
+    stop = loop.create_future()
+    jobs = dict[int, tg.WrapTask]()
+
+    async with tg.FallbaWait():
+        async with tg.Group() as gr:
+
+            def _done(jid: int, _: asyncio.Future[None]) -> None:
+                if (t := jobs.pop(jid, None)) is not None:
+                    gr._untrack_task(t)
+
+            def _message(msg: _Msg) -> None:
+                if msg[0] == "run":
+                    (t,) = gr.track_many([_job(ch, shm, *msg[1:])])
+                    if t.task is not None:
+                        jobs[msg[1]] = t
+                        t.task.add_done_callback(functools.partial(_done, msg[1]))
+                elif msg[0] == "cancel":
+                    if (c := jobs.get(msg[1])) is not None and c.task is not None:
+                        c.task.cancel()
+                elif not stop.done():
+                    stop.set_result(None)
+
+            def _lost() -> None:
+                if not stop.done():
+                    stop.set_result(None)
+
+            ch = await _connect(conn, _message, _lost)
+            await stop
+    await ch.aclose()
+
+
+def _main(conn: _Conn, shm: int | None) -> None:
+    try:
+        asyncio.run(_serve(conn, shm))
+    finally:
+        conn.close()
+
+
+class ProcessGroup:
+    workers: int
+    shm_threshold: int | None
+    group: tg.Group
+    waitee: tg.Waitee
+    _procs: list[multiprocessing.process.BaseProcess]
+    _chans: list[_Channel]
+    _inflight: list[dict[int, asyncio.Future[typing.Any]]]
+    _segments: dict[int, tuple[memoryview, _Segment]]
+    _closing: bool
+
+    def __init__(self, workers: int | None = None, shm_threshold: int | None = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.shm_threshold = shm_threshold
+        self.group = tg.Group()
+        self._procs = []
+        self._chans = []
+        self._inflight = []
+        self._segments = {}
+        self._closing = False
+
+    async def __aenter__(self) -> ProcessGroup:
+        self.waitee = await self.group.__aenter__()
+        ctx = multiprocessing.get_context("spawn")
+        for i in range(self.workers):
+            a, b = ctx.Pipe()
+            name = f"""{type(self).__name__}::{i}"""
+            p = ctx.Process(target=_main, args=(b, self.shm_threshold), name=name, daemon=True)
+            p.start()
+            b.close()
+            self._procs.append(p)
+            self._inflight.append({})
+            ch = await _connect(a, functools.partial(self._message, i), functools.partial(self._lost, i))
+            self._chans.append(ch)
+        return self
+
+    async def __aexit__(self, typ, val, tb) -> bool | None:
+        try:
+            return await self.group.__aexit__(typ, val, tb)
+        finally:
+            await self._shutdown()
+
+    def submit(self, fn: typing.Callable[..., typing.Awaitable[T]], *args: typing.Any) -> tg.WrapTask:
+        alive = [i for i, c in enumerate(self._chans) if not c.lost.done()]
+        if not len(alive):
+            raise RuntimeError("no live workers")
+        i = min(alive, key=lambda i: len(self._inflight[i]))
+        jid = next(_jid)
+        self._chans[i].send(("run", jid, pickle.dumps((fn, args))))
+        fut = asyncio.get_running_loop().create_future()
+        fut.add_done_callback(functools.partial(self._done, i, jid))
+        self._inflight[i][jid] = fut
+        t = tg.WrapTask(fut)
+        self.waitee._track_task(t)
+        return t
+
+    async def wait(self) -> None:
+        await self.waitee.wait()
+
+    def release(self, t: tg.WrapTask) -> None:
+        if t._restyp is tg.Restyp.VAL and (e := self._segments.pop(id(t._result), None)) is not None:
+            _release_shm(*e)
+
+    def _done(self, i: int, jid: int, fut: asyncio.Future[typing.Any]) -> None:
+        if self._inflight[i].pop(jid, None) is not None and fut.cancelled() and not self._closing:
+            self._chans[i].send(("cancel", jid))
+
+    def _message(self, i: int, msg: _Msg) -> None:
+        fut = self._inflight[i].pop(msg[1], None)
+        if msg[0] == "shm":
+            view, seg = _get_shm(msg[2], msg[3])
+            if fut is None or fut.done():
+                _release_shm(view, seg)
+            else:
+                self._segments[id(view)] = view, seg
+                fut.set_result(view)
+            return
+        if fut is None or fut.done():
+            return
+        if msg[0] == "ok":
+            try:
+                fut.set_result(pickle.loads(msg[2]))
+            except Exception as e:
+                fut.set_exception(e)
+        elif msg[0] == "exc":
+            fut.set_exception(_rebuild(msg[2], msg[3]))
+        else:
+            fut.cancel()
+
+    def _lost(self, i: int) -> None:
+        inflight, self._inflight[i] = self._inflight[i], {}
+        for fut in inflight.values():
+            if not fut.done():
+                fut.set_exception(RuntimeError(f"""worker {i} exited"""))
+
+    async def _shutdown(self) -> None:
+        for ch in self._chans:
+            ch.send(("close",))
+        self._closing = True
+
+        def join() -> None:
+            for p in self._procs:
+                p.join(5)
+                if p.is_alive():
+                    p.terminate()
+                    p.join()
+
+        await asyncio.to_thread(join)
+        # results still in flight may name segments, read them all so they get unlinked
+        await asyncio.wait([ch.lost for ch in self._chans], timeout=5)
+        for ch in self._chans:
+            if ch.transport is not None:
+                ch.transport.close()
+        segments, self._segments = self._segments, {}
+        for e in segments.values():
+            _release_shm(*e)
@@ -1,16 +1,30 @@
 from __future__ import annotations
 
 import asyncio
+import collections
+import collections.abc
+import concurrent.futures
 import contextvars
 import dataclasses
 import enum
+import functools
+import heapq
 import itertools
 import pathlib
+import random
+import sys
 import traceback
 import typing
 
 T = typing.TypeVar("T")
 
+_seq = itertools.count()
+
+# [when, seq, fn, arg], fn and arg are cleared on cancel
+_Timer = list[typing.Any]
+
+_Job = tuple[typing.Callable[..., typing.Awaitable[typing.Any]], tuple[typing.Any, ...], typing.Optional[str]]
+
 g_fallba: contextvars.ContextVar[Fallba] = contextvars.ContextVar("fallba")
 
 class Restyp(enum.Enum):
@@ -20,19 +34,41 @@ class Restyp(enum.Enum):
 
 
 class WrapTask:
+    __slots__ = ("task", "_restyp", "_result", "_seen", "_seq", "_waitees", "_timer")
 
-    task: asyncio.Task
+    task: asyncio.Future[typing.Any] | None
     _restyp: Restyp
     _result: typing.Any
+    _seen: bool
+    _seq: int
+    _waitees: list[Waitee]
+    _timer: _Timer | None
 
-    def __init__(self, task: asyncio.Task) -> None:
+    def __init__(self, task: asyncio.Future[typing.Any] | None, restyp: Restyp = Restyp.NA, result: typing.Any = None):
         self.task = task
-        self._restyp = Restyp.NA
-        self._result = None
+        self._restyp = restyp
+        self._result = result
+        self._seen = False
+        self._seq = next(_seq)
+        self._waitees = []
+        self._timer = None
+        if task is not None:
+            task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Future[typing.Any]) -> None:
+        if self._restyp is Restyp.NA:
+            self._result_set_try()
+
+    def done(self) -> bool:
+        return self._restyp is not Restyp.NA or typing.cast(asyncio.Future[typing.Any], self.task).done()
+
+    def cancelled(self) -> bool:
+        return self._restyp is Restyp.EXC and isinstance(self._result, asyncio.CancelledError)
 
     def result(self) -> typing.Any:
         if self._restyp is Restyp.NA:
             self._result_set_try()
+        self._seen = True
         if self._restyp is not Restyp.VAL:
             raise RuntimeError()
         return self._result
@@ -40,42 +76,534 @@ class WrapTask:
     def exception(self) -> BaseException:
         if self._restyp is Restyp.NA:
             self._result_set_try()
+        self._seen = True
         if self._restyp is not Restyp.EXC:
             raise RuntimeError()
         return self._result
 
     def _result_set_try(self) -> None:
-        if self.task.done():
-            if self.task.cancelled():
+        if (task := self.task) is not None and task.done():
+            if task.cancelled():
                 self._restyp = Restyp.EXC
-                self._result = self.task._make_cancelled_error()  # type: ignore
-            elif (exc := self.task.exception()) is not None:
+                self._result = task._make_cancelled_error()  # type: ignore
+            elif (exc := task.exception()) is not None:
                 self._restyp = Restyp.EXC
                 self._result = exc
             else:
                 self._restyp = Restyp.VAL
-                self._result = self.task.result()
+                self._result = task.result()
+            self.task = None
+            for w in self._waitees:
+                w._on_done(self)
+
+
+_started = object()
+
+
+class _Resume(collections.abc.Coroutine[typing.Any, typing.Any, T]):
+    # hands an already stepped coroutine to a Task: the first send yields what the eager step
+    # yielded, everything else (including a throw before that first send) goes to the coroutine
+
+    __slots__ = ("_coro", "_first")
+
+    _coro: typing.Coroutine[typing.Any, typing.Any, T]
+    _first: typing.Any
+
+    def __init__(self, coro: typing.Coroutine[typing.Any, typing.Any, T], first: typing.Any):
+        self._coro = coro
+        self._first = first
+
+    def send(self, value: typing.Any) -> typing.Any:
+        if (first := self._first) is not _started:
+            self._first = _started
+            return first
+        return self._coro.send(value)
+
+    def throw(self, *args: typing.Any) -> typing.Any:
+        self._first = _started
+        return self._coro.throw(*args)
+
+    def close(self) -> None:
+        self._first = _started
+        self._coro.close()
+
+    def __await__(self) -> typing.Generator[typing.Any, None, T]:
+        return (yield from typing.cast(typing.Generator[typing.Any, None, T], self))
+
+    def __iter__(self) -> _Resume[T]:
+        return self
+
+    def __next__(self) -> typing.Any:
+        return self.send(None)
+
+
+def _create_task(
+    loop: asyncio.AbstractEventLoop, coro: typing.Awaitable[T], name: str | None, eager: bool
+) -> WrapTask:
+    if not eager or not asyncio.iscoroutine(coro):
+        return WrapTask(loop.create_task(coro, name=name))
+    if (factory := getattr(asyncio, "eager_task_factory", None)) is not None:
+        t = WrapTask(factory(loop, coro, name=name))
+        t._result_set_try()
+        return t
+    ctx = contextvars.copy_context()
+    try:
+        first = ctx.run(coro.send, None)
+    except StopIteration as e:
+        return WrapTask(None, Restyp.VAL, e.value)
+    except (Exception, asyncio.CancelledError) as e:
+        return WrapTask(None, Restyp.EXC, e)
+    if sys.version_info < (3, 11):
+        # no context= before 3.11; the task copies the current context, i.e. ctx
+        return WrapTask(ctx.run(loop.create_task, _Resume(coro, first), name=name))
+    return WrapTask(loop.create_task(_Resume(coro, first), name=name, context=ctx))
+
+
+@dataclasses.dataclass(frozen=True)
+class Counts:
+    tasks: int
+    npend: int
+    ndone: int
+    ncanc: int
+    nfail: int
+
+
+_Frame = tuple[str, int | None, str]
+
+
+@dataclasses.dataclass(frozen=True)
+class Failure:
+    typ: type[BaseException]
+    stack: tuple[_Frame, ...]
+    count: int
+    exc: BaseException
+
+
+class TimerHeap:
+    __slots__ = ("_heap", "_handle", "_when", "_dead")
+
+    _heap: list[_Timer]
+    _handle: asyncio.TimerHandle | None
+    _when: float
+    _dead: int
+
+    def __init__(self) -> None:
+        self._heap = []
+        self._handle = None
+        self._when = 0.0
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self._heap) - self._dead
+
+    def push(self, when: float, fn: typing.Callable[[typing.Any], None], arg: typing.Any) -> _Timer:
+        heapq.heappush(self._heap, e := [when, next(_seq), fn, arg])
+        if self._handle is None or when < self._when:
+            self._arm()
+        return e
+
+    def cancel(self, e: _Timer) -> None:
+        if e[2] is None:
+            return
+        e[2] = e[3] = None
+        self._dead += 1
+        if self._dead > len(self._heap) // 2:
+            self._heap = [e for e in self._heap if e[2] is not None]
+            heapq.heapify(self._heap)
+            self._dead = 0
+
+    def _arm(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if len(self._heap):
+            self._when = self._heap[0][0]
+            self._handle = asyncio.get_running_loop().call_at(self._when, self._fire)
+
+    def _fire(self) -> None:
+        self._handle = None
+        loop = asyncio.get_running_loop()
+        now = max(self._when, loop.time())
+        try:
+            while len(self._heap) and self._heap[0][0] <= now:
+                _, _, fn, arg = heapq.heappop(self._heap)
+                if fn is None:
+                    self._dead -= 1
+                    continue
+                try:
+                    fn(arg)
+                except Exception as e:
+                    loop.call_exception_handler({"message": "TimerHeap callback failed", "exception": e})
+        finally:
+            self._arm()
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        for e in self._heap:
+            e[2] = e[3] = None
+        self._heap.clear()
+        self._dead = 0
+
+
+def _retryable(e: BaseException) -> bool:
+    return isinstance(e, Exception)
+
+
+@dataclasses.dataclass(frozen=True)
+class Retry:
+    attempts: int = 3
+    base: float = 0.1
+    factor: float = 2.0
+    cap: float = 30.0
+    jitter: float = 1.0
+    when: typing.Callable[[BaseException], bool] = _retryable
+
+    def delay(self, attempt: int) -> float:
+        d = min(self.cap, self.base * self.factor ** (attempt - 1))
+        return d - d * self.jitter * random.random()
+
+
+class _Retrying:
+    __slots__ = ("fn", "args", "name", "policy", "timers", "attempt", "outer", "task")
+
+    fn: typing.Callable[..., typing.Awaitable[typing.Any]]
+    args: tuple[typing.Any, ...]
+    name: str | None
+    policy: Retry
+    timers: TimerHeap
+    attempt: int
+    outer: asyncio.Future[typing.Any]
+    task: asyncio.Task[typing.Any] | None
+
+    def __init__(
+        self,
+        fn: typing.Callable[..., typing.Awaitable[typing.Any]],
+        args: tuple[typing.Any, ...],
+        name: str | None,
+        policy: Retry,
+        timers: TimerHeap,
+    ):
+        self.fn = fn
+        self.args = args
+        self.name = name
+        self.policy = policy
+        self.timers = timers
+        self.attempt = 0
+        self.outer = asyncio.get_running_loop().create_future()
+        self.outer.add_done_callback(self._cancel)
+        self.task = None
+
+    def start(self, _: None = None) -> None:
+        if self.outer.done():
+            return
+        self.attempt += 1
+        try:
+            coro = typing.cast(typing.Coroutine[typing.Any, typing.Any, typing.Any], self.fn(*self.args))
+        except Exception as e:
+            self.outer.set_exception(e)
+            return
+        self.task = asyncio.get_running_loop().create_task(coro, name=self.name)
+        self.task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task[typing.Any]) -> None:
+        if task.cancelled():
+            if not self.outer.done():
+                self.outer.cancel()
+            return
+        exc = task.exception()
+        if self.outer.done():
+            return
+        if exc is None:
+            self.outer.set_result(task.result())
+        elif self.attempt < self.policy.attempts and self.policy.when(exc):
+            self.timers.push(asyncio.get_running_loop().time() + self.policy.delay(self.attempt), self.start, None)
+        else:
+            self.outer.set_exception(exc)
+
+    def _cancel(self, outer: asyncio.Future[typing.Any]) -> None:
+        if outer.cancelled() and self.task is not None:
+            self.task.cancel()
 
 
 class Waitee:
-    tasks: set[WrapTask]
+    __slots__ = (
+        "tasks",
+        "_npend",
+        "_ndone",
+        "_ncanc",
+        "_nfail",
+        "_first_fail",
+        "_waiters",
+        "_limit",
+        "_pending",
+        "_queue",
+        "_workers",
+        "_order",
+        "_ordered",
+        "_window",
+        "thread_pool",
+        "process_pool",
+        "_timeout",
+        "_timers",
+        "_eager",
+        "_retry",
+    )
 
-    def __init__(self):
+    tasks: set[WrapTask]
+    _npend: int
+    _ndone: int
+    _ncanc: int
+    _nfail: int
+    _first_fail: WrapTask | None
+    _waiters: list[asyncio.Future[None]]
+    _limit: int | None
+    _pending: int
+    _queue: asyncio.Queue[_Job]
+    _workers: list[asyncio.Task]
+    _order: collections.deque[WrapTask] | None
+    _ordered: bool
+    _window: int
+    thread_pool: concurrent.futures.Executor | None
+    process_pool: concurrent.futures.Executor | None
+    _timeout: float | None
+    _timers: TimerHeap | None
+    _eager: bool
+    _retry: Retry | None
+
+    def __init__(
+        self,
+        limit: int | None = None,
+        pending: int = 0,
+        timeout: float | None = None,
+        eager: bool = False,
+        retry: Retry | None = None,
+    ):
         self.tasks = set[WrapTask]()
+        self._npend = 0
+        self._ndone = 0
+        self._ncanc = 0
+        self._nfail = 0
+        self._first_fail = None
+        self._waiters = []
+        self._limit = limit
+        self._pending = pending
+        self._workers = []
+        self._order = None
+        self._ordered = False
+        self._window = 0
+        self.thread_pool = None
+        self.process_pool = None
+        self._timeout = timeout
+        self._timers = None
+        self._eager = eager
+        self._retry = retry
+
+    @property
+    def npend(self) -> int:
+        return self._npend
+
+    @property
+    def ndone(self) -> int:
+        return self._ndone
+
+    @property
+    def ncanc(self) -> int:
+        return self._ncanc
+
+    @property
+    def nfail(self) -> int:
+        return self._nfail
+
+    def counts(self) -> Counts:
+        return Counts(len(self.tasks), self._npend, self._ndone, self._ncanc, self._nfail)
 
     def empty(self) -> bool:
         return not len(self.tasks)
 
     def cancel(self) -> None:
+        if self._timers is not None:
+            self._timers.close()
+        for w in self._workers:
+            w.cancel()
+        if len(self._workers):
+            while not self._queue.empty():
+                self._queue.get_nowait()
+                self._queue.task_done()
+        if not self._npend:
+            return
         for t in self.tasks:
-            if not t.task.done():
+            if t.task is not None and not t.task.done():
                 t.task.cancel()
 
+    def _tally(self, t: WrapTask, n: int) -> None:
+        self._ndone += n
+        if t.cancelled():
+            self._ncanc += n
+        elif t._restyp is Restyp.EXC:
+            self._nfail += n
+            if n > 0 and self._first_fail is None:
+                self._first_fail = t
+            elif n < 0 and self._first_fail is t:
+                self._first_fail = None
+
+    def _on_done(self, t: WrapTask) -> None:
+        if t._timer is not None and self._timers is not None:
+            self._timers.cancel(t._timer)
+            t._timer = None
+        self._npend -= 1
+        self._tally(t, 1)
+        if self._order is not None and not self._ordered:
+            self._order.append(t)
+        self._wake()
+
+    def _wake(self) -> None:
+        for f in self._waiters:
+            if not f.done():
+                f.set_result(None)
+        self._waiters.clear()
+
+    async def _changed(self) -> None:
+        self._waiters.append(f := asyncio.get_running_loop().create_future())
+        await f
+
+    def _idle(self) -> bool:
+        return not self._npend and (not len(self._workers) or self._queue.empty())
+
     def _track_task(self, t: WrapTask) -> None:
+        if t in self.tasks:
+            return
         self.tasks.add(t)
-
-    async def track_coro(self, coro: typing.Awaitable[T], name: str | None = None) -> None:
-        self._track_task(WrapTask(asyncio.get_running_loop().create_task(coro, name=name)))
+        t._waitees.append(self)
+        if t._restyp is Restyp.NA:
+            self._npend += 1
+        else:
+            self._tally(t, 1)
+        if self._order is not None and (self._ordered or t._restyp is not Restyp.NA):
+            self._order.append(t)
+
+    def _untrack_task(self, t: WrapTask) -> None:
+        if t not in self.tasks:
+            return
+        self.tasks.discard(t)
+        t._waitees.remove(self)
+        if t._restyp is Restyp.NA:
+            self._npend -= 1
+        else:
+            self._tally(t, -1)
+
+    def _timer_heap(self) -> TimerHeap:
+        if self._timers is None:
+            self._timers = TimerHeap()
+        return self._timers
+
+    def _expire_in(self, t: WrapTask) -> None:
+        if self._timeout is None or t._restyp is not Restyp.NA:
+            return
+        t._timer = self._timer_heap().push(asyncio.get_running_loop().time() + self._timeout, self._expire, t)
+
+    def _expire(self, t: WrapTask) -> None:
+        if t.task is not None and not t.task.done():
+            t.task.cancel()
+
+    async def track_coro(self, coro: typing.Awaitable[T], name: str | None = None) -> WrapTask:
+        t = _create_task(asyncio.get_running_loop(), coro, name, self._eager)
+        self._track_task(t)
+        self._expire_in(t)
+        return t
+
+    def track_many(
+        self,
+        coros: typing.Iterable[typing.Coroutine[typing.Any, typing.Any, T]],
+        names: typing.Iterable[str] | None = None,
+    ) -> list[WrapTask]:
+        loop = asyncio.get_running_loop()
+        pairs = zip(coros, names, strict=True) if names is not None else ((c, None) for c in coros)
+        if self._eager:
+            ts = [_create_task(loop, c, n, True) for c, n in pairs]
+            for t in ts:
+                self._track_task(t)
+                self._expire_in(t)
+            return ts
+        ts = [WrapTask(loop.create_task(c, name=n)) for c, n in pairs]
+        for t in ts:
+            t._waitees.append(self)
+        self.tasks.update(ts)
+        self._npend += len(ts)
+        if self._order is not None and self._ordered:
+            self._order.extend(ts)
+        if self._timeout is not None:
+            for t in ts:
+                self._expire_in(t)
+        return ts
+
+    def track_retry(
+        self,
+        fn: typing.Callable[..., typing.Awaitable[T]],
+        *args: typing.Any,
+        retry: Retry | None = None,
+        name: str | None = None,
+    ) -> WrapTask:
+        r = _Retrying(fn, args, name, retry or self._retry or Retry(), self._timer_heap())
+        r.start()
+        t = WrapTask(r.outer)
+        self._track_task(t)
+        self._expire_in(t)
+        return t
+
+    async def _track_job(
+        self, fn: typing.Callable[..., typing.Awaitable[T]], args: tuple[typing.Any, ...], name: str | None
+    ) -> WrapTask:
+        if self._retry is not None:
+            return self.track_retry(fn, *args, name=name)
+        return await self.track_coro(fn(*args), name)
+
+    async def submit(
+        self, fn: typing.Callable[..., typing.Awaitable[T]], *args: typing.Any, name: str | None = None
+    ) -> None:
+        if self._limit is None:
+            await self._track_job(fn, args, name)
+            return
+        if not len(self._workers):
+            loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue(self._pending)
+            self._workers = [
+                loop.create_task(self._worker(), name=f"""{type(self).__name__}::{self._worker.__name__}::{i}""")
+                for i in range(self._limit)
+            ]
+        await self._queue.put((fn, args, name))
+
+    async def _worker(self) -> None:
+        while True:
+            fn, args, name = await self._queue.get()
+            try:
+                while self._window and self._ndone >= self._window:
+                    await self._changed()
+                try:
+                    t = await self._track_job(fn, args, name)
+                except Exception as e:
+                    # e.g. a factory called with the wrong arity; record it, keep the worker
+                    t = WrapTask(None, Restyp.EXC, e)
+                    self._track_task(t)
+                if t.task is not None:
+                    await asyncio.wait([t.task])
+            finally:
+                self._queue.task_done()
+
+    def _track_executor(
+        self, pool: concurrent.futures.Executor | None, fn: typing.Callable[..., T], *args: typing.Any
+    ) -> WrapTask:
+        t = WrapTask(asyncio.get_running_loop().run_in_executor(pool, functools.partial(fn, *args)))
+        self._track_task(t)
+        self._expire_in(t)
+        return t
+
+    def track_sync(self, fn: typing.Callable[..., T], *args: typing.Any) -> WrapTask:
+        return self._track_executor(self.thread_pool or g_fallba.get().thread_pool(), fn, *args)
+
+    def track_process(self, fn: typing.Callable[..., T], *args: typing.Any) -> WrapTask:
+        return self._track_executor(self.process_pool or g_fallba.get().process_pool(), fn, *args)
 
     def track_from(self, waitee: Waitee) -> None:
         for t in waitee.tasks:
@@ -86,80 +614,163 @@ class Waitee:
             for t in waitee.tasks:
                 self._track_task(t)
         finally:
+            for t in waitee.tasks:
+                t._waitees.remove(waitee)
             waitee.tasks.clear()
+            waitee._npend = waitee._ndone = waitee._ncanc = waitee._nfail = 0
+            waitee._first_fail = None
 
-    def __str__(self) -> str:
-        name = type(self).__name__
-        tasks = len(self.tasks)
-        ndone = len([t for t in self.tasks if t.task.done()])
-        ncanc = len([t for t in self.tasks if t.task.cancelled()])
-        return f"""{name}(tasks={tasks}, ndone={ndone}, ncanc={ncanc})"""
+    async def wait(self) -> None:
+        while True:
+            if self._first_fail is not None:
+                raise self._first_fail.exception()
+            if self._idle():
+                return
+            await self._changed()
+
+    async def as_completed(self, ordered: bool = False, window: int = 0) -> typing.AsyncIterator[WrapTask]:
+        if ordered:
+            self._order = collections.deque(sorted(self.tasks, key=lambda t: t._seq))
+        else:
+            self._order = collections.deque(t for t in self.tasks if t._restyp is not Restyp.NA)
+        self._ordered = ordered
+        self._window = window
+        try:
+            while True:
+                if len(self._order) and self._order[0]._restyp is not Restyp.NA:
+                    t = self._order.popleft()
+                    self._untrack_task(t)
+                    self._wake()
+                    yield t
+                elif not len(self._order) and self._idle():
+                    return
+                else:
+                    await self._changed()
+        finally:
+            self._order = None
+            self._window = 0
+            self._wake()
 
+    def __aiter__(self) -> typing.AsyncIterator[WrapTask]:
+        return self.as_completed()
 
-class _Exiting:
-    pass
+    def __str__(self) -> str:
+        name = type(self).__name__
+        c = self.counts()
+        return f"""{name}(tasks={c.tasks}, ndone={c.ndone}, ncanc={c.ncanc}, nfail={c.nfail})"""
 
 
 class Fallba:
-    que_cond: asyncio.Condition
-    que: asyncio.Queue[asyncio.Task | _Exiting]
     waitee: Waitee
-    waiter: asyncio.Task
+    waiter: asyncio.Future[None]
     waiter_err: list[BaseException]
+    failures: collections.deque[WrapTask]
+    npend: int
     exiting: bool
-
-    def __init__(self):
-        self.que_cond = asyncio.Condition()
-        self.que = asyncio.Queue[asyncio.Task | _Exiting]()
+    threads: int | None
+    processes: int | None
+    eager: bool
+    _thread_pool: concurrent.futures.ThreadPoolExecutor | None
+    _process_pool: concurrent.futures.ProcessPoolExecutor | None
+
+    def __init__(
+        self, ring: int = 0, threads: int | None = None, processes: int | None = None, eager: bool = False
+    ):
         self.waitee = Waitee()
-        self.waiter = asyncio.get_running_loop().create_task(
-            self._waiter(), name=f"{type(self).__name__}::{self._waiter.__name__}"
-        )
+        self.waiter = asyncio.get_running_loop().create_future()
         self.waiter_err = []
+        self.failures = collections.deque[WrapTask](maxlen=ring)
+        self.npend = 0
+        self.exiting = False
+        self.threads = threads
+        self.processes = processes
+        self.eager = eager
+        self._thread_pool = None
+        self._process_pool = None
+
+    def thread_pool(self) -> concurrent.futures.Executor | None:
+        if self._thread_pool is None and self.threads is not None:
+            self._thread_pool = concurrent.futures.ThreadPoolExecutor(self.threads)
+        return self._thread_pool
+
+    def process_pool(self) -> concurrent.futures.Executor:
+        if self._process_pool is None:
+            self._process_pool = concurrent.futures.ProcessPoolExecutor(self.processes)
+        return self._process_pool
 
-    async def _waiter(self) -> None:
-        await self._waiter_loop()
-        if len(self.waiter_err):
-            raise RuntimeError(self.waiter_err)  # TODO: raise BaseException should any be in waiter_err
+    def track_from(self, waitee: Waitee) -> None:
+        for t in waitee.tasks:
+            self._track_task(t)
 
-    async def _waiter_loop(self) -> None:
-        while True:
-            async with self.que_cond:
-                await self.que_cond.wait_for(self._waiter_cond)
-                ds = [self.que.get_nowait() for x in range(self.que.qsize())]
-            ts = typing.cast(
-                typing.Iterable[asyncio.Task], itertools.takewhile(lambda x: isinstance(x, asyncio.Task), ds)
+    def _track_task(self, t: WrapTask) -> None:
+        if t.task is None or t.task.done():
+            self._release(t)
+        else:
+            self.waitee._track_task(t)
+            self.npend += 1
+            t.task.add_done_callback(functools.partial(self._reap, t))
+
+    def _reap(self, t: WrapTask, task: asyncio.Future[typing.Any]) -> None:
+        self.npend -= 1
+        self.waitee._untrack_task(t)
+        self._release(t)
+        if self.exiting and not self.npend:
+            self._exited()
+
+    def _release(self, t: WrapTask) -> None:
+        if t._restyp is Restyp.NA:
+            t._result_set_try()
+        if t._restyp is not Restyp.EXC or isinstance(t._result, asyncio.CancelledError):
+            return
+        self.failures.append(t)
+        if not t._seen:
+            asyncio.get_running_loop().call_exception_handler(
+                {"message": "Task exception was never retrieved", "exception": t._result}
             )
-            exiting = any(isinstance(x, _Exiting) for x in ds)  # TODO: O(N)
-            await self._waiter_wait_all(ts)
-            if exiting:
-                return
-
-    def _waiter_cond(self) -> bool:
-        return self.que.qsize() > 0
 
-    async def _waiter_wait_all(self, tasks: typing.Iterable[asyncio.Task]) -> None:
-        pending = set(tasks)
-        while len(pending):
-            done, pending = await asyncio.wait(pending)
+    def _exited(self) -> None:
+        if self.waiter.done():
+            return
+        if len(self.waiter_err):
+            # TODO: raise BaseException should any be in waiter_err
+            self.waiter.set_exception(RuntimeError(self.waiter_err))
+        else:
+            self.waiter.set_result(None)
 
     async def _wait_exited(self) -> None:
         done, pending = await asyncio.wait([self.waiter])
         assert self.waiter.done()
 
     async def exit(self) -> None:
-        async with self.que_cond:
-            self.que.put_nowait(_Exiting())
-            self.que_cond.notify()
-        await self._wait_exited()
+        self.exiting = True
+        if not self.npend:
+            self._exited()
+        try:
+            await self._wait_exited()
+        finally:
+            for pool in (self._thread_pool, self._process_pool):
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
 
 
 class FallbaWait:
     _fallba: Fallba
     _token: contextvars.Token[Fallba]
+    _ring: int
+    _threads: int | None
+    _processes: int | None
+    _eager: bool
+
+    def __init__(
+        self, ring: int = 0, threads: int | None = None, processes: int | None = None, eager: bool = False
+    ):
+        self._ring = ring
+        self._threads = threads
+        self._processes = processes
+        self._eager = eager
 
     async def __aenter__(self) -> None:
-        self._fallba = Fallba()
+        self._fallba = Fallba(self._ring, self._threads, self._processes, self._eager)
         self._token = g_fallba.set(self._fallba)
         return None
 
@@ -170,23 +781,63 @@ class FallbaWait:
             g_fallba.reset(self._token)
 
 
+def _stack_sig(val: BaseException) -> tuple[type[BaseException], tuple[_Frame, ...]]:
+    tb = traceback.walk_tb(val.__traceback__)
+    local = tuple((f.f_code.co_filename, n, f.f_code.co_name) for f, n in tb)
+    if (remote := getattr(val, "remote_stack", None)) is None:
+        return type(val), local
+    return type(val), local + tuple((f.filename, f.lineno, f.name) for f in remote)
+
+
 class _GroupExceptionMixin:
     src: BaseException
     waitee: Waitee
+    limit: typing.ClassVar[int] = 10
+    _lines: list[str] | None
+    _failures: list[Failure] | None
 
     def __init__(self, src: BaseException, waitee: Waitee):
         self.src = src
         self.waitee = waitee
+        self._lines = None
+        self._failures = None
 
     def __str__(self):
         # name = type(self).__name__
         # return f"""{name}({repr(self.src)}, {self.waitee})"""
-        fmt = self._format()
-        return "\n" + "\n".join(fmt)
+        if self._lines is None:
+            self._lines = self._format()
+        return "\n" + "\n".join(self._lines)
 
     def _traceback_exc(self, val: BaseException):
         # assert val.__traceback__ is not None # TODO: apparently can be None
-        return traceback.TracebackException.from_exception(val)
+        te = traceback.TracebackException.from_exception(val)
+        if (remote := getattr(val, "remote_stack", None)) is not None:
+            te.stack = traceback.StackSummary.from_list([*te.stack, *remote])
+        return te
+
+    @property
+    def failures(self) -> list[Failure]:
+        if self._failures is None:
+            sigs = dict[tuple[type[BaseException], tuple[_Frame, ...]], list[typing.Any]]()
+            for t in sorted(self.waitee.tasks, key=lambda t: t._seq):
+                if t._restyp is Restyp.NA:
+                    t._result_set_try()
+                if t._restyp is not Restyp.EXC:
+                    continue
+                exc = t.exception()
+                if (e := sigs.get(k := _stack_sig(exc))) is None:
+                    sigs[k] = [exc, 1]
+                else:
+                    e[1] += 1
+            self._failures = [Failure(typ, stack, n, exc) for (typ, stack), (exc, n) in sigs.items()]
+        return self._failures
+
+    def histogram(self) -> dict[type[BaseException], int]:
+        out = collections.Counter[type[BaseException]]()
+        for f in self.failures:
+            out[f.typ] += f.count
+        return dict(out)
 
     def _format(self) -> list[str]:
         out = list[str]()
@@ -195,10 +846,13 @@ class _GroupExceptionMixin:
         feo = self._format_exc_one(te, """== - """)
         out.extend(feo)
 
-        for i, t in enumerate(self.waitee.tasks):
-            te = self._traceback_exc(t.exception())
-            feo = self._format_exc_one(te, f"""   {i} """)
+        failed = self.failures
+        for i, f in enumerate(failed[: self.limit]):
+            te = self._traceback_exc(f.exc)
+            feo = self._format_exc_one(te, f"""   {i} """ if f.count == 1 else f"""   {i} (x{f.count}) """)
             out.extend(feo)
+        if len(rest := failed[self.limit :]):
+            out.append(f"""   … and {len(rest)} more ({sum(f.count for f in rest)} tasks)""")
 
         return out
 
@@ -208,7 +862,6 @@ class _GroupExceptionMixin:
         fill = " " * len(hedr)
         tbident = " " * _tbident
 
-        te = self._traceback_exc(self.src)
         feo = list(te.format_exception_only())
         out.extend([f"""{hedr if i == 0 else fill}{l}""".rstrip() for i, l in enumerate(feo)])
         out.extend([f"""{tbident}{l}""" for l in self._format_tb_one(te)])
@@ -226,6 +879,8 @@ class _GroupExceptionMixin:
             line: str
 
         ds = list(reversed([D(pathlib.Path(f.filename).name, f.name, f.lineno, f.line) for f in te.stack]))
+        if not len(ds):
+            return out
         mf1 = len(max(ds, key=lambda x: len(x.name)).name)
         mf2 = len(max(ds, key=lambda x: len(x.fname)).fname)
         mf3 = len(str(max(ds, key=lambda x: len(str(x.lineno))).lineno))
@@ -252,6 +907,10 @@ class GroupException(_GroupExceptionMixin, Exception):
         return super().__str__()
 
 
+class GroupTimeoutException(GroupException, TimeoutError):
+    pass
+
+
 class GroupExceptionWait:
     async def __aenter__(self) -> None:
         return None
@@ -263,21 +922,74 @@ class GroupExceptionWait:
 class Group:
     waitee: Waitee
     fallba: Fallba
-
-    def __init__(self):
-        self.waitee = Waitee()
+    deadline: float | None
+    _host: asyncio.Task[typing.Any] | None
+    _cancelling: int
+    _expired: bool
+
+    def __init__(
+        self,
+        limit: int | None = None,
+        pending: int = 0,
+        threads: int | None = None,
+        processes: int | None = None,
+        deadline: float | None = None,
+        per_task_timeout: float | None = None,
+        eager: bool | None = None,
+        retry: Retry | None = None,
+    ):
         self.fallba = g_fallba.get()
+        eager = self.fallba.eager if eager is None else eager
+        self.waitee = Waitee(limit, pending, per_task_timeout, eager, retry)
+        self.deadline = deadline
+        self._host = None
+        self._cancelling = 0
+        self._expired = False
+        if threads is not None:
+            self.waitee.thread_pool = concurrent.futures.ThreadPoolExecutor(threads)
+        if processes is not None:
+            self.waitee.process_pool = concurrent.futures.ProcessPoolExecutor(processes)
 
     async def __aenter__(self) -> Waitee:
+        if self.deadline is not None:
+            self._host = asyncio.current_task()
+            assert self._host is not None
+            if sys.version_info >= (3, 11):
+                self._cancelling = self._host.cancelling()
+            loop = asyncio.get_running_loop()
+            self.waitee._timer_heap().push(loop.time() + self.deadline, self._expire, None)
         return self.waitee
 
+    def _deadline_msg(self) -> str:
+        return f"{type(self).__name__} deadline {id(self):#x}"
+
+    def _expire(self, _: None) -> None:
+        self._expired = True
+        typing.cast(asyncio.Task[typing.Any], self._host).cancel(self._deadline_msg())
+
+    def _own_cancel(self, val: BaseException | None) -> bool:
+        if sys.version_info >= (3, 11):
+            return typing.cast(asyncio.Task[typing.Any], self._host).uncancel() <= self._cancelling
+        # no cancel counting before 3.11; match the message we cancelled with
+        return val is not None and val.args == (self._deadline_msg(),)
+
     async def __aexit__(self, typ, val, tb) -> bool | None:
         self.waitee.cancel()
-        self.fallba.waitee.track_from(self.waitee)
+        if self._expired and typ is asyncio.CancelledError and self._own_cancel(val):
+            val = TimeoutError()
+        if val is not None and not isinstance(val, asyncio.CancelledError):
+            for t in self.waitee.tasks:
+                t._seen = True
+        self.fallba.track_from(self.waitee)
+        for pool in (self.waitee.thread_pool, self.waitee.process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
 
         if val is not None:
             if isinstance(val, asyncio.CancelledError):
                 return False
+            elif isinstance(val, TimeoutError) and self._expired:
+                raise GroupTimeoutException(val, self.waitee)
             elif isinstance(val, Exception):
                 raise GroupException(val, self.waitee)
             elif isinstance(val, BaseException):
@@ -2,12 +2,17 @@ import asyncio
 import contextlib
 import dataclasses
 import dis
+import errno
 import logging
+import os
 import pathlib
+import resource
 import sys
 import traceback
+import typing
 
 import _pytest._code.code
+import pp.procgroup as pg
 import pp.taskgroup as tg
 import pytest
 
@@ -246,6 +251,248 @@ def test_zz() -> None:
             assert p.returncode == 0
 
 
+def test_zz_binary() -> None:
+    import importlib.resources
+    import subprocess
+    import sys
+
+    payload = bytes(range(256)) * 1024
+
+    with importlib.resources.path("pp", "inout.py") as pi:
+        with subprocess.Popen(
+            [sys.executable, "-u", str(pi), "--binary", "--chunk", "4096"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            shell=False,
+        ) as p:
+            so, se = p.communicate(payload)
+            assert so == payload
+            assert p.returncode == 0
+
+
+@pytest.mark.parametrize("zerocopy", [[], ["--no-zerocopy"], ["--no-zerocopy", "--no-mmap"]])
+def test_zz_file(tmp_path: pathlib.Path, zerocopy: list[str]) -> None:
+    import importlib.resources
+    import subprocess
+    import sys
+
+    payload = bytes(range(256)) * 4096
+    (fi := tmp_path / "in").write_bytes(payload)
+
+    with importlib.resources.path("pp", "inout.py") as pi:
+        with open(fi, "rb") as i, open(fo := tmp_path / "out", "wb") as o:
+            subprocess.run([sys.executable, "-u", str(pi), "--binary", *zerocopy], stdin=i, stdout=o, check=True)
+    assert fo.read_bytes() == payload
+
+
+@pytest.mark.parametrize("zerocopy", [[], ["--no-zerocopy"]])
+def test_zz_procfs(tmp_path: pathlib.Path, zerocopy: list[str]) -> None:
+    import importlib.resources
+    import subprocess
+    import sys
+
+    with importlib.resources.path("pp", "inout.py") as pi:
+        with open("/proc/version", "rb") as i:
+            cmd = [sys.executable, "-u", str(pi), "-b", *zerocopy]
+            p = subprocess.run(cmd, stdin=i, stdout=subprocess.PIPE, check=True)
+    assert len(p.stdout) and p.stdout == pathlib.Path("/proc/version").read_bytes()
+
+
+def test_mcopy_grow(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    import os
+
+    import pp.inout as io_
+
+    (fi := tmp_path / "in").write_bytes(b"a" * 10000)
+    with open(fi, "rb") as i, open(fo := tmp_path / "out", "wb") as o:
+        real = os.write
+
+        def write(fd: int, d: typing.Any) -> int:
+            if fd == o.fileno() and fi.stat().st_size == 10000:
+                with open(fi, "ab") as a:
+                    a.write(b"b" * 5000)
+            return real(fd, d)
+
+        monkeypatch.setattr(os, "write", write)
+        assert io_.mcopy(i.fileno(), o.fileno(), chunk=4096)
+        monkeypatch.undo()
+    assert fo.read_bytes() == b"a" * 10000 + b"b" * 5000
+
+
+def test_zz_stats(tmp_path: pathlib.Path) -> None:
+    import importlib.resources
+    import json
+    import subprocess
+    import sys
+
+    payload = b"x" * 100000
+
+    with importlib.resources.path("pp", "inout.py") as pi:
+        p = subprocess.run(
+            [sys.executable, "-u", str(pi), "-b", "--no-zerocopy", "--chunk", "1000", "--stats-json", tmp_path / "s"],
+            input=payload,
+            capture_output=True,
+            check=True,
+        )
+    assert p.stdout == payload
+    st = json.loads((tmp_path / "s").read_text())
+    assert st["rbytes"] == st["wbytes"] == len(payload)
+    assert st["wchunks"] == sum(st["lat"]) and st["p50_us"] <= st["p99_us"]
+
+
+def test_bytequeue() -> None:
+    import threading
+
+    import pp.inout as io_
+
+    q = io_.ByteQueue(high=8, low=4)
+    got = list[bytes]()
+
+    def get() -> None:
+        while len(d := q.get()):
+            got.append(d)
+
+    t = threading.Thread(target=get)
+    t.start()
+    for _ in range(100):
+        assert q.put(b"abc")
+    assert q.put(b"")
+    t.join()
+    assert b"".join(got) == b"abc" * 100
+    assert q.stats.npeak <= 8 + 3 and q.stats.nput == q.stats.nget == 101
+
+    q.close()
+    assert not q.put(b"x")
+
+
+def test_writev() -> None:
+    import os
+    import threading
+
+    import pp.inout as io_
+
+    bufs = [bytes([i % 256]) * (i % 7 + 1) for i in range(io_.IOV_MAX * 3)]
+    want = b"".join(bufs)
+    r, w = os.pipe()
+    got = list[bytes]()
+
+    def rd() -> None:
+        while len(d := os.read(r, 1000)):
+            got.append(d)
+
+    t = threading.Thread(target=rd)
+    t.start()
+    io_.writev(w, bufs)
+    os.close(w)
+    t.join()
+    os.close(r)
+    assert b"".join(got) == want
+
+
+def test_mux() -> None:
+    import os
+
+    import pp.inout as io_
+
+    payload = [bytes([i]) * (1000 * i + 1) for i in range(20)]
+    pairs = list[tuple[int, int]]()
+    outs = list[int]()
+    for d in payload:
+        ri, wi = os.pipe()
+        ro, wo = os.pipe()
+        os.write(wi, d)
+        os.close(wi)
+        pairs.append((ri, wo))
+        outs.append(ro)
+    ri, wi = os.pipe()
+    ro, wo = os.pipe()
+    os.write(wi, b"x")
+    os.close(ro)
+    pairs.append((ri, wo))
+
+    errs = io_.mux(pairs, chunk=4096)
+    assert all(not len(e) for e in errs[:-1])
+    assert len(errs[-1]) == 1 and isinstance(errs[-1][0], BrokenPipeError)
+    for ro, d in zip(outs, payload):
+        with open(ro, "rb") as f:
+            assert f.read() == d
+    for ri, _ in pairs:
+        os.close(ri)
+    os.close(wi)
+
+
+def test_tee(tmp_path: pathlib.Path) -> None:
+    import os
+    import threading
+
+    import pp.inout as io_
+
+    payload = bytes(range(256)) * 4096
+    ri, wi = os.pipe()
+    rs, ws = os.pipe()
+
+    def feed() -> None:
+        with open(wi, "wb") as f:
+            f.write(payload)
+
+    t = threading.Thread(target=feed)
+    t.start()
+    sinks = [io_.Sink(open(tmp_path / f"{i}", "wb")) for i in range(3)]
+    slow = io_.Sink(open(ws, "wb"), io_.Slow.DETACH, high=1 << 16)
+    errs = io_.tee(ri, [*sinks, slow], chunk=4096)
+    t.join()
+    os.close(ri)
+    os.close(rs)
+
+    assert slow.detached and not len(errs) and not len(io_.err)
+    for i in range(3):
+        assert (tmp_path / f"{i}").read_bytes() == payload
+
+
+@pytest.mark.asyncio
+async def test_apump() -> None:
+    import os
+
+    import pp.ainout as ai
+
+    payload = bytes(range(256)) * 4096
+    ri, wi = os.pipe()
+    ro, wo = os.pipe()
+
+    def feed() -> None:
+        with open(wi, "wb") as f:
+            f.write(payload)
+
+    def drain() -> bytes:
+        with open(ro, "rb") as f:
+            return f.read()
+
+    async with tg.FallbaWait():
+        fe = asyncio.create_task(asyncio.to_thread(feed))
+        dr = asyncio.create_task(asyncio.to_thread(drain))
+        await ai.pump(open(ri, "rb", buffering=0), open(wo, "wb", buffering=0), chunk=4096)
+        await fe
+        assert await dr == payload
+
+
+@pytest.mark.asyncio
+async def test_apump_exc() -> None:
+    import os
+
+    import pp.ainout as ai
+
+    ri, wi = os.pipe()
+    ro, wo = os.pipe()
+    os.close(ro)
+    os.write(wi, b"x" * 1024)
+
+    with pytest.raises(tg.GroupException) as ei:
+        async with tg.FallbaWait():
+            await ai.pump(open(ri, "rb", buffering=0), open(wo, "wb", buffering=0))
+    assert isinstance(ei.value.src, (BrokenPipeError, ConnectionResetError))
+    os.close(wi)
+
+
 def test_dis() -> None:
     def a():
         with contextlib.nullcontext():
@@ -508,3 +755,513 @@ async def test_exc2() -> None:
                 raise RuntimeError("a")
 
     await a()
+
+
+@pytest.mark.asyncio
+async def test_fallba_reap() -> None:
+    fin = list[int]()
+
+    async def b(i: int) -> None:
+        try:
+            await asyncio.sleep(ALOT)
+        finally:
+            await asyncio.sleep(0.01 * (i % 3))
+            fin.append(i)
+
+    async with tg.FallbaWait():
+        for _ in range(3):
+            async with tg.Group() as gr:
+                for i in range(10):
+                    await gr.track_coro(b(i))
+                await asyncio.sleep(0)
+        fallba = tg.g_fallba.get()
+        assert fallba.npend == 30
+
+    assert fallba.npend == 0 and len(fin) == 30
+
+
+@pytest.mark.asyncio
+async def test_fallba_compact() -> None:
+    handled = list[dict[str, typing.Any]]()
+    loop = asyncio.get_running_loop()
+    loop.set_exception_handler(lambda loop, ctx: handled.append(ctx))
+
+    async def ok() -> int:
+        return 1
+
+    async def bad(i: int) -> None:
+        raise RuntimeError(i)
+
+    try:
+        async with tg.FallbaWait(ring=4):
+            fallba = tg.g_fallba.get()
+            for i in range(100):
+                async with tg.Group() as gr:
+                    await gr.track_coro(ok())
+                    await gr.track_coro(bad(i))
+                    await gr.track_coro(asyncio.sleep(ALOT))
+                    await asyncio.sleep(0)
+            assert len(fallba.waitee.tasks) == fallba.npend <= 2
+    finally:
+        loop.set_exception_handler(None)
+
+    assert fallba.waitee.empty()
+    assert [t.exception().args[0] for t in fallba.failures] == [96, 97, 98, 99]
+    assert len(handled) == 100
+
+
+@pytest.mark.asyncio
+async def test_waitee_counts() -> None:
+    async def ok() -> int:
+        return 1
+
+    async def bad() -> None:
+        raise RuntimeError()
+
+    w = tg.Waitee()
+    for _ in range(3):
+        await w.track_coro(ok())
+    await w.track_coro(bad())
+    s = await w.track_coro(asyncio.sleep(ALOT))
+    st = s.task
+    assert st is not None
+    assert w.counts() == tg.Counts(tasks=5, npend=5, ndone=0, ncanc=0, nfail=0)
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert w.counts() == tg.Counts(tasks=5, npend=1, ndone=4, ncanc=0, nfail=1)
+    w.cancel()
+    await asyncio.wait([st])
+    assert s.task is None
+    await asyncio.sleep(0)
+    assert w.counts() == tg.Counts(tasks=5, npend=0, ndone=5, ncanc=1, nfail=1)
+    assert str(w) == "Waitee(tasks=5, ndone=5, ncanc=1, nfail=1)"
+
+    w2 = tg.Waitee()
+    w2.steal_from(w)
+    assert w.counts() == tg.Counts(0, 0, 0, 0, 0) and w2.counts() == tg.Counts(5, 0, 5, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_group_limit() -> None:
+    live = 0
+    peak = 0
+    ran = list[int]()
+
+    async def job(i: int) -> int:
+        nonlocal live, peak
+        live += 1
+        peak = max(peak, live)
+        await asyncio.sleep(0.001)
+        live -= 1
+        ran.append(i)
+        if i == 30:
+            raise RuntimeError(i)
+        return i
+
+    with pytest.raises(tg.GroupException) as ei:
+        async with tg.FallbaWait():
+            async with tg.Group(limit=3, pending=5) as gr:
+                for i in range(100):
+                    await gr.submit(job, i)
+                    assert gr._queue.qsize() <= 5
+                await gr.wait()
+    assert isinstance(ei.value.src, RuntimeError) and ei.value.src.args == (30,)
+    assert peak == 3 and 30 in ran and len(ran) < 100
+
+
+@pytest.mark.asyncio
+async def test_group_limit_bad_factory() -> None:
+    ran = list[int]()
+
+    async def job(i: int) -> None:
+        ran.append(i)
+
+    with pytest.raises(tg.GroupException) as ei:
+        async with tg.FallbaWait():
+            async with tg.Group(limit=2) as gr:
+                await gr.submit(job)
+                await gr.submit(job, 1, 2)
+                await gr.submit(job, 3)
+                await asyncio.wait_for(gr.wait(), 5)
+    assert isinstance(ei.value.src, TypeError) and ran == [3]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ordered", [False, True])
+async def test_as_completed(ordered: bool) -> None:
+    async def job(i: int) -> int:
+        await asyncio.sleep(0.001 * (i % 4))
+        if i == 7:
+            raise RuntimeError(i)
+        return i
+
+    got = list[int]()
+    async with tg.FallbaWait():
+        async with tg.Group(limit=4) as gr:
+            for i in range(20):
+                await gr.submit(job, i)
+            async for t in gr.as_completed(ordered=ordered, window=4):
+                assert gr.ndone <= 4 + 4
+                got.append(t.exception().args[0] if t._restyp is tg.Restyp.EXC else t.result())
+            assert gr.empty()
+
+    assert sorted(got) == list(range(20))
+    assert (got == list(range(20))) == ordered
+
+
+@pytest.mark.asyncio
+async def test_track_executor() -> None:
+    import math
+    import time
+
+    ran = list[int]()
+
+    def block(i: int) -> int:
+        time.sleep(0.05)
+        ran.append(i)
+        return i
+
+    async with tg.FallbaWait(threads=2):
+        async with tg.Group() as gr:
+            a = gr.track_sync(block, 1)
+            b = gr.track_process(math.factorial, 20)
+            await gr.wait()
+        assert a.result() == 1 and b.result() == math.factorial(20)
+
+        ran.clear()
+        with pytest.raises(tg.GroupException):
+            async with tg.Group(threads=1) as gr:
+                for i in range(5):
+                    gr.track_sync(block, i)
+                await asyncio.sleep(0.01)
+                raise RuntimeError()
+        assert gr.ncanc >= 4
+    assert len(ran) <= 1
+
+
+@pytest.mark.asyncio
+async def test_group_exc_format() -> None:
+    errs = [type(f"E{i}", (RuntimeError,), {}) for i in range(15)]
+
+    async def same() -> None:
+        raise RuntimeError("same")
+
+    async def other(i: int) -> None:
+        raise errs[i]()
+
+    with pytest.raises(tg.GroupException) as ei:
+        async with tg.FallbaWait():
+            async with tg.Group() as gr:
+                for i in range(50):
+                    await gr.track_coro(same())
+                for i in range(15):
+                    await gr.track_coro(other(i))
+                await gr.track_coro(asyncio.sleep(ALOT))
+                await asyncio.sleep(0)
+                raise RuntimeError("src")
+
+    s = str(ei.value)
+    warn(s)
+    assert s is str(ei.value) or s == str(ei.value)
+    assert ei.value._lines is not None
+    assert "RuntimeError: src" in s.splitlines()[1]
+    assert "(x50) RuntimeError: same" in s
+    assert "… and 7 more (7 tasks)" in s
+
+    fs = ei.value.failures
+    assert fs is ei.value.failures
+    assert len(fs) == 17
+    assert fs[0].typ is RuntimeError and fs[0].count == 50 and str(fs[0].exc) == "same"
+    assert fs[0].stack[-1][2] == "same"
+    assert [f.typ for f in fs[1:16]] == errs and fs[16].typ is asyncio.CancelledError
+    assert sum(f.count for f in fs) == 66
+    h = ei.value.histogram()
+    assert h[RuntimeError] == 50 and h[asyncio.CancelledError] == 1 and h[errs[3]] == 1
+
+
+@pytest.mark.asyncio
+async def test_group_deadline() -> None:
+    async def job(i: int) -> int:
+        await asyncio.sleep(0.001 if i % 2 else ALOT)
+        return i
+
+    async with tg.FallbaWait():
+        async with tg.Group(per_task_timeout=0.05) as gr:
+            for i in range(100):
+                await gr.track_coro(job(i))
+            assert gr._timers is not None and len(gr._timers) == 100
+            await gr.wait()
+            c = gr.counts()
+            assert c.ndone == 100 and c.ncanc == 50 and c.nfail == 0
+
+        async with tg.Group(per_task_timeout=ALOT) as gr:
+            ts = gr.track_many(job(1) for _ in range(100))
+            assert gr._timers is not None and len(gr._timers) == 100
+            await gr.wait()
+            assert not len(gr._timers) and len(gr._timers._heap) <= 50
+            assert all(t._timer is None for t in ts)
+
+    with pytest.raises(tg.GroupTimeoutException) as ei:
+        async with tg.FallbaWait():
+            async with tg.Group(deadline=0.05) as gr:
+                for i in range(10):
+                    await gr.track_coro(job(i))
+                await gr.wait()
+    assert isinstance(ei.value, TimeoutError) and isinstance(ei.value.src, TimeoutError)
+    ct = asyncio.current_task()
+    assert ct is not None
+    if sys.version_info >= (3, 11):
+        assert not ct.cancelling()
+
+    async with tg.FallbaWait():
+        async with tg.Group(deadline=ALOT) as gr:
+            await gr.track_coro(job(1))
+            await gr.wait()
+        assert gr._timers is not None and not len(gr._timers)
+
+
+@pytest.mark.asyncio
+async def test_track_many() -> None:
+    async def job(i: int) -> int:
+        await asyncio.sleep(0)
+        return i
+
+    async with tg.FallbaWait():
+        async with tg.Group() as gr:
+            ts = gr.track_many((job(i) for i in range(100)), names=(f"""j{i}""" for i in range(100)))
+            assert gr.npend == 100 and len(gr.tasks) == 100
+            assert isinstance(t7 := ts[7].task, asyncio.Task) and t7.get_name() == "j7"
+            await gr.wait()
+            assert gr.ndone == 100 and [t.result() for t in ts] == list(range(100))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("factory", [True, False])
+async def test_eager(factory: bool, monkeypatch: pytest.MonkeyPatch) -> None:
+    if not factory:
+        monkeypatch.delattr(asyncio, "eager_task_factory", raising=False)
+    elif not hasattr(asyncio, "eager_task_factory"):
+        pytest.skip("no asyncio.eager_task_factory")
+    seen = list[str]()
+
+    async def hit(i: int) -> int:
+        return i
+
+    async def bad() -> None:
+        raise RuntimeError("bad")
+
+    async def miss(i: int) -> int:
+        seen.append(f"""a{i}""")
+        try:
+            await asyncio.sleep(0)
+        except asyncio.CancelledError:
+            seen.append(f"""c{i}""")
+            raise
+        finally:
+            seen.append(f"""f{i}""")
+        seen.append(f"""b{i}""")
+        await asyncio.sleep(0.001)
+        return i
+
+    async with tg.FallbaWait(eager=True):
+        async with tg.Group() as gr:
+            t = await gr.track_coro(hit(1))
+            assert t.task is None and t.result() == 1
+            t = await gr.track_coro(miss(2))
+            assert seen == ["a2"] and t.task is not None
+            ts = gr.track_many(hit(i) for i in range(10))
+            assert all(x.task is None for x in ts)
+            await gr.wait()
+            assert t.result() == 2 and seen == ["a2", "f2", "b2"]
+            assert gr.counts() == tg.Counts(12, 0, 12, 0, 0)
+
+            c = await gr.track_coro(miss(3))
+            assert isinstance(c.task, asyncio.Task) and c.task.cancel()
+            await gr.wait()
+            assert c.cancelled() and seen[-3:] == ["a3", "c3", "f3"]
+
+            await gr.track_coro(miss(4))
+        assert seen[-1] == "a4"
+    assert seen[-3:] == ["a4", "c4", "f4"]
+
+    with pytest.raises(tg.GroupException) as ei:
+        async with tg.FallbaWait():
+            async with tg.Group(eager=True) as gr:
+                t = await gr.track_coro(bad())
+                assert t.task is None and gr.nfail == 1
+                await gr.wait()
+    assert isinstance(ei.value.src, RuntimeError)
+
+
+async def _pg_job(i: int) -> tuple[int, int]:
+    await asyncio.sleep(0.001)
+    if i == 7:
+        raise ValueError(i)
+    return i * i, os.getpid()
+
+
+async def _pg_sleep() -> None:
+    await asyncio.sleep(ALOT)
+
+
+@pytest.mark.asyncio
+async def test_process_group() -> None:
+    async with tg.FallbaWait():
+        async with pg.ProcessGroup(2) as gr:
+            ts = [gr.submit(_pg_job, i) for i in range(6)]
+            await gr.wait()
+    assert [t.result()[0] for t in ts] == [i * i for i in range(6)]
+    assert len({t.result()[1] for t in ts} - {os.getpid()}) == 2
+    assert not any(p.is_alive() for p in gr._procs)
+
+    with pytest.raises(tg.GroupException) as ei:
+        async with tg.FallbaWait():
+            async with pg.ProcessGroup(2) as gr:
+                for i in range(10):
+                    gr.submit(_pg_job, i)
+                s = gr.submit(_pg_sleep)
+                await gr.wait()
+    assert isinstance(ei.value.src, ValueError) and ei.value.src.args == (7,)
+    assert [f.stack[-1][2] for f in ei.value.failures if f.typ is ValueError] == ["_pg_job"]
+    assert "_pg_job" in str(ei.value)
+    assert s.cancelled()
+    assert not any(p.is_alive() for p in gr._procs)
+
+
+async def _pg_echo(a: bytes) -> bytes:
+    return a
+
+
+@pytest.mark.asyncio
+async def test_process_group_big() -> None:
+    blob = os.urandom(1 << 20)
+    async with tg.FallbaWait():
+        async with pg.ProcessGroup(1) as gr:
+            ts = [gr.submit(_pg_echo, blob) for _ in range(20)]
+            await asyncio.wait_for(gr.wait(), 60)
+    assert all(t.result() == blob for t in ts)
+
+
+async def _pg_blob(n: int) -> bytes:
+    return bytes(range(256)) * (n // 256)
+
+
+async def _pg_blob_late(n: int) -> bytes:
+    try:
+        await asyncio.sleep(ALOT)
+    except asyncio.CancelledError:
+        pass
+    return bytes(n)
+
+
+async def _pg_blob_nofd(n: int) -> bytes:
+    # no new descriptors from here on, so the worker cannot open the shared memory segment
+    resource.setrlimit(resource.RLIMIT_NOFILE, (3, resource.getrlimit(resource.RLIMIT_NOFILE)[1]))
+    return bytes(n)
+
+
+@pytest.mark.asyncio
+async def test_process_group_shm() -> None:
+    before = set(os.listdir("/dev/shm"))
+    async with tg.FallbaWait():
+        async with pg.ProcessGroup(2, shm_threshold=1 << 16) as gr:
+            small = gr.submit(_pg_blob, 1024)
+            big = [gr.submit(_pg_blob, 1 << 20) for _ in range(3)]
+            await gr.wait()
+            assert small.result() == bytes(range(256)) * 4
+            assert all(isinstance(t.result(), memoryview) for t in big)
+            assert bytes(big[0].result()) == bytes(range(256)) * 4096
+            assert len(gr._segments) == 3
+            v = big[0].result()
+            gr.release(big[0])
+            assert len(gr._segments) == 2
+            with pytest.raises(ValueError):
+                v[0]
+    assert not len(gr._segments)
+    with pytest.raises(ValueError):
+        big[1].result()[0]
+    assert set(os.listdir("/dev/shm")) <= before
+
+    async with tg.FallbaWait():
+        async with pg.ProcessGroup(2, shm_threshold=1 << 16) as gr:
+            ts = [gr.submit(_pg_blob_late, 1 << 20) for _ in range(4)]
+            await asyncio.sleep(0.5)
+    assert all(t.cancelled() for t in ts)
+    assert set(os.listdir("/dev/shm")) <= before
+
+    with pytest.raises(tg.GroupException) as ei:
+        async with tg.FallbaWait():
+            async with pg.ProcessGroup(1, shm_threshold=1 << 16) as gr:
+                gr.submit(_pg_blob_nofd, 1 << 20)
+                await asyncio.wait_for(gr.wait(), 20)
+    assert isinstance(ei.value.src, OSError) and ei.value.src.errno == errno.EMFILE
+
+
+@pytest.mark.asyncio
+async def test_retry() -> None:
+    calls = dict[str, int]()
+
+    async def flaky(key: str, fails: int, exc: type[Exception] = ConnectionError) -> str:
+        calls[key] = calls.get(key, 0) + 1
+        await asyncio.sleep(0)
+        if calls[key] <= fails:
+            raise exc(key, calls[key])
+        return key
+
+    fast = tg.Retry(attempts=3, base=0.001)
+    async with tg.FallbaWait():
+        async with tg.Group() as gr:
+            ok = gr.track_retry(flaky, "ok", 2, retry=fast)
+            await gr.wait()
+            assert ok.result() == "ok" and calls["ok"] == 3
+            assert gr.counts() == tg.Counts(1, 0, 1, 0, 0)
+
+    with pytest.raises(tg.GroupException) as ei:
+        async with tg.FallbaWait():
+            retry = tg.Retry(attempts=4, base=0.001, when=lambda e: not isinstance(e, ValueError))
+            async with tg.Group(limit=2, retry=retry) as gr:
+                for i in range(5):
+                    await gr.submit(flaky, f"""s{i}""", i)
+                await gr.submit(flaky, "never", 99)
+                await gr.submit(flaky, "value", 99, ValueError)
+                # let every job finish its retries before wait() raises the first failure
+                while gr.counts().ndone < 7:
+                    await asyncio.sleep(0.001)
+                await gr.wait()
+    assert [calls[f"""s{i}"""] for i in range(5)] == [1, 2, 3, 4, 4]
+    assert calls["never"] == 4 and calls["value"] == 1
+    assert ei.value.histogram() == {ConnectionError: 2, ValueError: 1}
+
+    def sync_fail(key: str) -> typing.Awaitable[str]:
+        calls[key] = calls.get(key, 0) + 1
+        if calls[key] > 1:
+            raise ValueError(key)
+        return flaky(f"""{key}!""", 1)
+
+    with pytest.raises(tg.GroupTimeoutException):
+        async with tg.FallbaWait():
+            async with tg.Group(deadline=0.2) as gr:
+                sf = gr.track_retry(sync_fail, "sync", retry=fast)
+                with pytest.raises(ValueError):
+                    await gr.wait()
+                assert isinstance(sf.exception(), ValueError) and calls["sync"] == 2
+                await asyncio.sleep(ALOT)
+
+    heap = tg.TimerHeap()
+    fired = list[int]()
+    now = asyncio.get_running_loop().time()
+    def boom(_: None) -> None:
+        raise ZeroDivisionError()
+
+    heap.push(now, boom, None)
+    heap.push(now + 0.001, fired.append, 1)
+    await asyncio.sleep(0.05)
+    assert fired == [1] and not len(heap)
+
+    async with tg.FallbaWait():
+        async with tg.Group() as gr:
+            t = gr.track_retry(flaky, "canc", 99, retry=tg.Retry(attempts=99, base=ALOT))
+            await asyncio.sleep(0.01)
+            gr.cancel()
+            await gr.wait()
+            assert t.cancelled() and calls["canc"] == 1